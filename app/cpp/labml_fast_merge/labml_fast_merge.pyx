@@ -3,6 +3,7 @@
 import numpy as np
 cimport numpy as np
 cimport cython
+from libc.math cimport atan2, fabs, isfinite
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -33,3 +34,93 @@ def merge(np.ndarray[np.double_t, ndim=1] values,
             j += 1
 
     return i + 1  # size after merging
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def remove_nan(np.ndarray[np.double_t, ndim=1] values,
+               double prev_value,  # value to fill a leading nan with
+               ):
+    cdef int length = values.shape[0]
+    cdef int i
+
+    if length == 0:
+        return
+
+    if not isfinite(values[0]):
+        values[0] = prev_value
+    for i in range(1, length):
+        if not isfinite(values[i]):
+            values[i] = values[i - 1]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def smooth_value(np.ndarray[np.double_t, ndim=1] values,
+                 int span,
+                 ):
+    cdef int length = values.shape[0]
+    cdef int span_extra = span // 2
+    cdef np.ndarray[np.double_t, ndim=1] smoothed = np.empty(length)
+    cdef double total = 0
+    cdef int n = 0
+    cdef int i, j
+
+    for i in range(length + span_extra):
+        j = i - span_extra
+        if i < length:
+            total += values[i]
+            n += 1
+        if j - span_extra - 1 >= 0:
+            total -= values[j - span_extra - 1]
+            n -= 1
+        if j >= 0:
+            smoothed[j] = total / n
+
+    return smoothed
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def mean_angle(np.ndarray[np.double_t, ndim=1] last_step,
+               np.ndarray[np.double_t, ndim=1] smoothed,
+               double x_range,
+               double y_range,
+               double aspect_ratio,
+               ):
+    cdef int length = smoothed.shape[0]
+    cdef double total = 0
+    cdef double dx, dy
+    cdef int i
+
+    if length < 2:
+        return np.nan
+
+    for i in range(length - 1):
+        dx = (last_step[i + 1] - last_step[i]) / x_range
+        dy = (smoothed[i + 1] - smoothed[i]) / y_range
+        total += atan2(fabs(dy) * aspect_ratio, fabs(dx))
+
+    return total / (length - 1)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def get_extent(np.ndarray[np.double_t, ndim=1] values,
+               double outlier_margin,
+               ):
+    cdef int length = values.shape[0]
+    cdef int margin = max(int(length * outlier_margin), 1)
+    cdef double std_dev = np.std(values[margin:length - margin])
+    cdef np.ndarray[np.double_t, ndim=1] sorted_values = np.sort(values)
+    cdef int start = 0
+    cdef int end = length - 1
+
+    while start < margin:
+        if sorted_values[start] + std_dev * 2 > sorted_values[margin]:
+            break
+        start += 1
+    while end > length - margin - 1:
+        if sorted_values[end] - std_dev * 2 < sorted_values[length - margin]:
+            break
+        end -= 1
+
+    return [sorted_values[start], sorted_values[end]]
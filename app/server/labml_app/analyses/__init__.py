@@ -3,22 +3,40 @@ from typing import Dict, List, Tuple, Callable
 from . import analysis
 from .series import SeriesModel
 from ..analyses_settings import experiment_analyses, computer_analyses
+from .experiments import comparison  # routes that don't track indicators
 
 EXPERIMENT_ANALYSES = {}
 for ans in experiment_analyses:
     EXPERIMENT_ANALYSES[ans.__name__] = ans
 
 
+def _group_by_type(data: Dict[str, SeriesModel]) -> Dict[str, Dict[str, SeriesModel]]:
+    res = {}
+    for ind, s in data.items():
+        ind_type = ind.partition('.')[0]
+        if ind_type not in res:
+            res[ind_type] = {}
+        res[ind_type][ind] = s
+
+    return res
+
+
 class AnalysisManager:
     @staticmethod
     def track(run_uuid: str, data: Dict[str, SeriesModel]) -> None:
+        data_by_type = _group_by_type(data)
         for ans in experiment_analyses:
-            ans.get_or_create(run_uuid).track(data)
+            ans_data = ans.select_indicators(data_by_type)
+            if ans_data:
+                ans.get_or_create(run_uuid).track(ans_data)
 
     @staticmethod
     def track_computer(session_uuid: str, data: Dict[str, SeriesModel]) -> None:
+        data_by_type = _group_by_type(data)
         for ans in computer_analyses:
-            ans.get_or_create(session_uuid).track(data)
+            ans_data = ans.select_indicators(data_by_type)
+            if ans_data:
+                ans.get_or_create(session_uuid).track(ans_data)
 
     @staticmethod
     def delete_run(run_uuid: str) -> None:
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, List
 
 from .series import SeriesModel
 
@@ -8,9 +8,19 @@ DB_INDEXES = []
 
 
 class Analysis:
+    indicator_types: List[str] = []
+
     def track(self, data: Dict[str, SeriesModel]) -> None:
         raise NotImplementedError
 
+    @classmethod
+    def select_indicators(cls, data_by_type: Dict[str, Dict[str, SeriesModel]]) -> Dict[str, SeriesModel]:
+        res = {}
+        for ind_type in cls.indicator_types:
+            res.update(data_by_type.get(ind_type, {}))
+
+        return res
+
     @staticmethod
     def get_or_create(run_uuid: str):
         raise NotImplementedError
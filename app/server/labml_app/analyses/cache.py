@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+MAX_CACHE_SIZE = 256
+
+
+class FrozenDict(dict):
+    """
+    A dictionary of a cached response, which raises on changes.
+    It's still a `dict`, so responses serialize to JSON as they are.
+    """
+
+    def _raise(self, *args, **kwargs):
+        raise TypeError('cached responses are shared; copy them before changing')
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _raise
+
+    def __reduce__(self):
+        # copies are plain dictionaries that can be changed
+        return dict, (dict(self),)
+
+
+def freeze(value: Any) -> Any:
+    """
+    Makes a response immutable, with lists as tuples and dictionaries as `FrozenDict`s
+    """
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+
+    return value
+
+
+class ResponseCache:
+    """
+    Caches computed responses of series collections.
+    Entries are keyed by the collection and tagged with the collection's `version`,
+     so a response is reused until the collection tracks new data.
+    Responses are frozen when cached and hits return them as they are, since they are shared.
+    Callers that need to change a response copy it.
+    """
+    _entries: OrderedDict
+
+    def __init__(self, max_size: int = MAX_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, name: str, version: int, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, None)
+            is_hit = entry is not None and entry['version'] == version and name in entry['responses']
+            if is_hit:
+                self._entries.move_to_end(key)
+                value = entry['responses'][name]
+
+        if is_hit:
+            return value
+
+        value = freeze(compute())
+
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None or entry['version'] != version:
+                entry = {'version': version, 'responses': {}}
+                self._entries[key] = entry
+            entry['responses'][name] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+response_cache = ResponseCache()
@@ -36,6 +36,8 @@ class BatteryPreferencesIndex(Index['BatteryPreferences']):
 class BatteryAnalysis(Analysis):
     battery: BatteryModel
 
+    indicator_types = [COMPUTEREnums.BATTERY]
+
     def __init__(self, data):
         self.battery = data
 
@@ -49,9 +51,12 @@ class BatteryAnalysis(Analysis):
         self.battery.track(res)
 
     def get_tracking(self):
+        return self.battery.get_cached('tracking', self._get_tracking)
+
+    def _get_tracking(self):
         res = []
         summary = {}
-        for ind, track in self.battery.tracking.items():
+        for ind, track in self.battery.get_all_series().items():
             name = ind.split('.')
 
             if 'secsleft' in name:
@@ -98,6 +103,7 @@ class BatteryAnalysis(Analysis):
         if battery_key:
             b: BatteryModel = battery_key.load()
             BatteryIndex.delete(session_uuid)
+            b.delete_series()
             b.delete()
 
         if preferences_key:
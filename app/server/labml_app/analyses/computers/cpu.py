@@ -37,6 +37,8 @@ class CPUPreferencesIndex(Index['CPUPreferences']):
 class CPUAnalysis(Analysis):
     cpu: CPUModel
 
+    indicator_types = [COMPUTEREnums.CPU]
+
     def __init__(self, data):
         self.cpu = data
 
@@ -50,9 +52,12 @@ class CPUAnalysis(Analysis):
         self.cpu.track(res)
 
     def get_tracking(self):
+        return self.cpu.get_cached('tracking', self._get_tracking)
+
+    def _get_tracking(self):
         res = []
         summary = []
-        for ind, track in self.cpu.tracking.items():
+        for ind, track in self.cpu.get_all_series().items():
             name = ind.split('.')
 
             if any(x in ['freq', 'system', 'idle', 'user'] for x in name):
@@ -96,6 +101,7 @@ class CPUAnalysis(Analysis):
         if cpu_key:
             c: CPUModel = cpu_key.load()
             CPUIndex.delete(session_uuid)
+            c.delete_series()
             c.delete()
 
         if preferences_key:
@@ -37,6 +37,8 @@ class DiskPreferencesIndex(Index['DiskPreferences']):
 class DiskAnalysis(Analysis):
     disk: DiskModel
 
+    indicator_types = [COMPUTEREnums.DISK]
+
     def __init__(self, data):
         self.disk = data
 
@@ -50,8 +52,11 @@ class DiskAnalysis(Analysis):
         self.disk.track(res)
 
     def get_tracking(self):
+        return self.disk.get_cached('tracking', self._get_tracking)
+
+    def _get_tracking(self):
         res = []
-        for ind, track in self.disk.tracking.items():
+        for ind, track in self.disk.get_all_series().items():
             name = ind.split('.')
 
             if any(x in ['total'] for x in name):
@@ -93,6 +98,7 @@ class DiskAnalysis(Analysis):
         if disk_key:
             d: DiskModel = disk_key.load()
             DiskIndex.delete(session_uuid)
+            d.delete_series()
             d.delete()
 
         if preferences_key:
@@ -36,6 +36,8 @@ class GPUPreferencesIndex(Index['GPUPreferences']):
 class GPUAnalysis(Analysis):
     gpu: GPUModel
 
+    indicator_types = [COMPUTEREnums.GPU]
+
     def __init__(self, data):
         self.gpu = data
 
@@ -49,8 +51,11 @@ class GPUAnalysis(Analysis):
         self.gpu.track(res)
 
     def get_tracking(self):
+        return self.gpu.get_cached('tracking', self._get_tracking)
+
+    def _get_tracking(self):
         res = []
-        for ind, track in self.gpu.tracking.items():
+        for ind, track in self.gpu.get_all_series().items():
             name = ind.split('.')
 
             if [i for i in name if i in ['total', 'limit']]:
@@ -88,6 +93,7 @@ class GPUAnalysis(Analysis):
         if gpu_key:
             g: GPUModel = gpu_key.load()
             GPUIndex.delete(session_uuid)
+            g.delete_series()
             g.delete()
 
         if preferences_key:
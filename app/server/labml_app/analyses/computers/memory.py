@@ -38,6 +38,8 @@ class MemoryPreferencesIndex(Index['MemoryPreferences']):
 class MemoryAnalysis(Analysis):
     memory: MemoryModel
 
+    indicator_types = [COMPUTEREnums.MEMORY]
+
     def __init__(self, data):
         self.memory = data
 
@@ -51,8 +53,11 @@ class MemoryAnalysis(Analysis):
         self.memory.track(res)
 
     def get_tracking(self):
+        return self.memory.get_cached('tracking', self._get_tracking)
+
+    def _get_tracking(self):
         res = []
-        for ind, track in self.memory.tracking.items():
+        for ind, track in self.memory.get_all_series().items():
             name = ind.split('.')
 
             if any(x in ['total'] for x in name):
@@ -94,6 +99,7 @@ class MemoryAnalysis(Analysis):
         if memory_key:
             m: MemoryModel = memory_key.load()
             MemoryIndex.delete(session_uuid)
+            m.delete_series()
             m.delete()
 
         if preferences_key:
@@ -38,6 +38,8 @@ class NetworkPreferencesIndex(Index['NetworkPreferences']):
 class NetworkAnalysis(Analysis):
     network: NetworkModel
 
+    indicator_types = [COMPUTEREnums.NETWORK]
+
     def __init__(self, data):
         self.network = data
 
@@ -51,8 +53,11 @@ class NetworkAnalysis(Analysis):
         self.network.track(res)
 
     def get_tracking(self):
+        return self.network.get_cached('tracking', self._get_tracking)
+
+    def _get_tracking(self):
         res = []
-        for ind, track in self.network.tracking.items():
+        for ind, track in self.network.get_all_series().items():
             name = ind.split('.')
             series: Dict[str, Any] = Series().load(track).detail
             series['name'] = '.'.join(name)
@@ -90,6 +95,7 @@ class NetworkAnalysis(Analysis):
         if network_key:
             n: NetworkModel = network_key.load()
             NetworkIndex.delete(session_uuid)
+            n.delete_series()
             n.delete()
 
         if preferences_key:
@@ -1,5 +1,6 @@
-from typing import Dict, Set, Any
+from typing import Dict, Set, Any, List
 
+import numpy as np
 from fastapi import Request
 from fastapi.responses import JSONResponse
 from labml_db import Model, Index
@@ -16,6 +17,10 @@ SERIES_NAMES = ['rss', 'vms', 'cpu', 'threads', 'user', 'system']
 STATIC_NAMEs = ['name', 'create_time', 'pid', 'ppid', 'dead', 'exe', 'cmdline']
 
 ALMOST_ZERO = 1.0E-2
+NEGLIGIBLE_RSS = 32 * 1024 * 1024
+TOP_K = 50
+MAX_PROCESSES = 1000
+COMPACTION_INTERVAL = 20
 
 
 @Analysis.db_model(PickleSerializer, 'Process')
@@ -29,6 +34,11 @@ class ProcessModel(Model['ProcessModel'], SeriesCollection):
     dead: Dict[str, bool]
     gpu_processes: Dict[str, Set[str]]
     zero_cpu_processes: Dict[str, Dict['str', Any]]
+    resources: Dict[str, Dict[str, float]]
+    aggregates: Dict[str, Dict[str, float]]
+    is_resources_indexed: bool
+    tracks_since_compaction: int
+    is_fully_compacted: bool
 
     @classmethod
     def defaults(cls):
@@ -42,6 +52,11 @@ class ProcessModel(Model['ProcessModel'], SeriesCollection):
             dead={},
             gpu_processes={},
             zero_cpu_processes={},
+            resources={},
+            aggregates={},
+            is_resources_indexed=False,
+            tracks_since_compaction=0,
+            is_fully_compacted=False,
         )
 
 
@@ -63,11 +78,17 @@ class ProcessPreferencesIndex(Index['ProcessPreferences']):
 class ProcessAnalysis(Analysis):
     process: ProcessModel
 
+    indicator_types = [COMPUTEREnums.PROCESS]
+
     def __init__(self, data):
         self.process = data
         self.process.max_buffer_length = 100
 
     def track(self, data: Dict[str, SeriesModel]):
+        if not self.process.is_resources_indexed:
+            self._index_resources()
+            self.process.is_resources_indexed = True
+
         res: Dict[str, SeriesModel] = {}
         for ind, s in data.items():
             ind_split = ind.split('.')
@@ -113,45 +134,160 @@ class ProcessAnalysis(Analysis):
                         self.process.gpu_processes[process_id].add(gpu_process)
                     else:
                         self.process.gpu_processes[process_id] = {gpu_process}
+                elif suffix in ['cpu', 'rss']:
+                    self._update_resources(process_id, suffix, s['value'])
 
                 res[ind] = s
 
+        self.process.tracks_since_compaction += 1
+        if (self.process.tracks_since_compaction >= COMPACTION_INTERVAL or
+                (len(self.process.names) > MAX_PROCESSES and not self.process.is_fully_compacted)):
+            removed = self.compact()
+            res = {ind: s for ind, s in res.items() if '.'.join(ind.split('.')[:2]) not in removed}
+
         self.process.track(res)
 
+    def _update_resources(self, process_id: str, suffix: str, values: List[float]) -> None:
+        """
+        The index of processes by resource usage has the mean CPU of the last update and the maximum RSS
+        """
+        if len(values) == 0:
+            return
+
+        if process_id not in self.process.resources:
+            self.process.resources[process_id] = {'cpu': 0., 'rss': 0.}
+        resources = self.process.resources[process_id]
+
+        if suffix == 'cpu':
+            resources['cpu'] = float(np.mean(values))
+        else:
+            resources['rss'] = max(resources['rss'], float(np.max(values)))
+
+    def _is_negligible(self, process_id: str) -> bool:
+        resources = self.process.resources.get(process_id, {'cpu': 0., 'rss': 0.})
+
+        return resources['cpu'] < ALMOST_ZERO and resources['rss'] < NEGLIGIBLE_RSS
+
+    def compact(self) -> Set[str]:
+        """
+        Dead processes with negligible CPU and RSS are rolled up into aggregates by process name,
+         and their series are removed.
+        If there are still more than `MAX_PROCESSES` processes,
+         dead processes with the least CPU usage are rolled up too.
+        When nothing is rolled up, it's not tried again until the next `COMPACTION_INTERVAL` tracks.
+        """
+        self.process.tracks_since_compaction = 0
+
+        dead = [process_id for process_id, is_dead in self.process.dead.items() if is_dead]
+        removed = [process_id for process_id in dead if self._is_negligible(process_id)]
+
+        n_over = len(self.process.names) - len(removed) - MAX_PROCESSES
+        if n_over > 0:
+            removed_set = set(removed)
+            others = [process_id for process_id in dead if process_id not in removed_set]
+            others.sort(key=lambda process_id: self.process.resources.get(process_id, {}).get('cpu', 0.))
+            removed += others[:n_over]
+
+        removed_set = set(removed)
+        self.process.is_fully_compacted = not removed
+        if not removed:
+            return removed_set
+
+        for process_id in removed:
+            self._aggregate(process_id)
+
+        self.process.remove_series([ind for ind in self.process.get_series_names()
+                                    if '.'.join(ind.split('.')[:2]) in removed_set])
+        self.process.zero_cpu_processes = {}
+
+        logger.debug(f'compacted {len(removed)} processes: {self.process.key}')
+
+        return removed_set
+
+    def _aggregate(self, process_id: str) -> None:
+        name = self.process.names.get(process_id, '')
+        resources = self.process.resources.pop(process_id, {'cpu': 0., 'rss': 0.})
+
+        if name not in self.process.aggregates:
+            self.process.aggregates[name] = {'count': 0, 'cpu': 0., 'rss': 0.}
+        aggregate = self.process.aggregates[name]
+
+        aggregate['count'] += 1
+        aggregate['cpu'] += resources['cpu']
+        aggregate['rss'] = max(aggregate['rss'], resources['rss'])
+
+        for static in [self.process.names, self.process.exes, self.process.cmdlines, self.process.create_times,
+                       self.process.pids, self.process.ppids, self.process.dead, self.process.gpu_processes]:
+            static.pop(process_id, None)
+
+    def get_aggregates(self) -> List[Dict[str, Any]]:
+        res = [{'name': name, 'count': a['count'], 'mean_cpu': a['cpu'] / a['count'], 'max_rss': a['rss']}
+               for name, a in self.process.aggregates.items()]
+        res.sort(key=lambda a: a['count'], reverse=True)
+
+        return res
+
     def get_tracking(self):
-        res = {}
-        zero_cpu_processes = {}
-        for ind, track in self.process.tracking.items():
+        return self.process.get_cached('tracking', self._get_tracking)
+
+    def _index_resources(self) -> None:
+        """
+        Processes tracked before the resource index are added to it from their series.
+        This is saved by `track`; listings only build it in memory.
+        """
+        indexed = set(self.process.resources.keys())
+        for ind in self.process.get_series_names():
             ind_split = ind.split('.')
             process_id = '.'.join(ind_split[:-1])
+            suffix = ind_split[-1]
+            if suffix not in ['cpu', 'rss'] or 'gpu' in process_id or process_id in indexed:
+                continue
 
-            dead = self.process.dead.get(process_id, 0)
-            if dead:
+            track = self.process.get_series(ind)
+            if track is None or len(track['value']) == 0:
                 continue
 
-            if process_id not in res:
-                res[process_id] = {'process_id': process_id,
-                                   'dead': dead,
-                                   'pid': self.process.pids.get(process_id, 0),
-                                   'name': self.process.names.get(process_id, ''),
-                                   'is_zero_cpu': False,
-                                   }
+            self._update_resources(process_id, suffix, track['value'][-1:] if suffix == 'cpu' else track['value'])
 
-            suffix = ind_split[-1]
-            if suffix in ['cpu', 'rss']:
-                s = Series().load(track)
+    def _get_top(self, is_zero_cpu: bool) -> List[str]:
+        """
+        Top `TOP_K` live processes by CPU usage, from the resource index
+        """
+        if not self.process.is_resources_indexed:
+            self._index_resources()
+
+        res = []
+        for process_id, resources in self.process.resources.items():
+            if self.process.dead.get(process_id, 0):
+                continue
+            if (resources['cpu'] < ALMOST_ZERO) != is_zero_cpu:
+                continue
+            res.append((resources['cpu'], process_id))
 
-                # TODO better not to cache this and avoid smoothing for zero cpu processes
-                if suffix == 'cpu' and s.summary['mean'] < ALMOST_ZERO:
-                    zero_cpu_processes[process_id] = res[process_id]
-                    res[process_id]['is_zero_cpu'] = True
+        res.sort(reverse=True)
 
-                series: Dict[str, Any] = s.detail
-                res[process_id][suffix] = series
+        return [process_id for cpu, process_id in res[:TOP_K]]
 
+    def _get_process_summary(self, process_id: str, is_zero_cpu: bool) -> Dict[str, Any]:
+        res = {'process_id': process_id,
+               'dead': self.process.dead.get(process_id, 0),
+               'pid': self.process.pids.get(process_id, 0),
+               'name': self.process.names.get(process_id, ''),
+               'is_zero_cpu': is_zero_cpu,
+               }
+
+        for suffix in ['cpu', 'rss']:
+            track = self.process.get_series(f'{process_id}.{suffix}')
+            if track is not None:
+                res[suffix] = Series().load(track).detail
+
+        return res
+
+    def _get_tracking(self):
         ret = []
-        for k, v in res.items():
-            if v['is_zero_cpu'] or 'cpu' not in v or 'rss' not in v:
+        for process_id in self._get_top(False):
+            v = self._get_process_summary(process_id, False)
+            if 'cpu' not in v or 'rss' not in v:
                 continue
 
             ret.append(v)
@@ -163,14 +299,12 @@ class ProcessAnalysis(Analysis):
             v['cpu']['name'] = v['name']
             summary.append(v['cpu'])
 
-        self.process.zero_cpu_processes = zero_cpu_processes
-        self.process.save()
-
         return ret, summary
 
     def get_zero_cpu_processes(self):
         ret = []
-        for k, v in self.process.zero_cpu_processes.items():
+        for process_id in self._get_top(True):
+            v = self._get_process_summary(process_id, True)
             if 'cpu' not in v or 'rss' not in v:
                 continue
 
@@ -195,7 +329,7 @@ class ProcessAnalysis(Analysis):
         for s_name in SERIES_NAMES:
             ind = process_id + f'.{s_name}'
 
-            track = self.process.tracking.get(ind, {})
+            track = self.process.get_series(ind)
             if track:
                 series: Dict[str, Any] = Series().load(track).detail
                 series['name'] = s_name
@@ -206,7 +340,7 @@ class ProcessAnalysis(Analysis):
             s_name = f'{gpu_process}.mem'
             ind = f'{process_id}.{s_name}'
 
-            track = self.process.tracking.get(ind, {})
+            track = self.process.get_series(ind)
             if track:
                 series: Dict[str, Any] = Series().load(track).detail
                 series['name'] = s_name
@@ -221,7 +355,7 @@ class ProcessAnalysis(Analysis):
         process_key = ProcessIndex.get(session_uuid)
 
         if not process_key:
-            p = ProcessModel()
+            p = ProcessModel(is_resources_indexed=True)
             p.save()
             ProcessIndex.set(session_uuid, p.key)
 
@@ -241,6 +375,7 @@ class ProcessAnalysis(Analysis):
         if process_key:
             p: ProcessModel = process_key.load()
             ProcessIndex.delete(session_uuid)
+            p.delete_series()
             p.delete()
 
         if preferences_key:
@@ -266,6 +401,22 @@ def get_process_tracking(request: Request, session_uuid: str) -> Any:
     return response
 
 
+@Analysis.route('GET', 'process/aggregates/{session_uuid}')
+def get_process_aggregates(request: Request, session_uuid: str) -> Any:
+    aggregates = []
+    status_code = 404
+
+    ans = ProcessAnalysis.get_or_create(session_uuid)
+    if ans:
+        aggregates = ans.get_aggregates()
+        status_code = 200
+
+    response = JSONResponse({'aggregates': aggregates})
+    response.status_code = status_code
+
+    return response
+
+
 @Analysis.route('GET', 'process/zero_cpu/{session_uuid}')
 def get_zero_cpu_processes(request: Request, session_uuid: str) -> Any:
     track_data = []
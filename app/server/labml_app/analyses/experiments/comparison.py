@@ -1,13 +1,22 @@
-from typing import Any, Dict
+import json
+import math
+from typing import Any, Dict, List, Optional, Iterator
 
+import numpy as np
 from fastapi import Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from labml_db import Model, Index
 from labml_db.serializer.pickle import PickleSerializer
 from labml_db.serializer.yaml import YamlSerializer
 
 from labml_app.logger import logger
 from ..analysis import Analysis
+from ..series import Series
 from .. import preferences
+from .metrics import MetricsIndex, MetricsModel, RANGE_POINTS, MAX_RANGE_POINTS
+
+MAX_RUNS = 32
+OVERSAMPLING = 4
 
 
 class ComparisonPreferences(preferences.Preferences):
@@ -87,3 +96,106 @@ async def set_comparison_preferences(request: Request, run_uuid: str) -> Any:
     logger.debug(f'update comparison preferences: {cp.key}')
 
     return {'errors': cp.errors}
+
+
+def _align(track: Optional[Dict[str, Any]], grid: np.ndarray) -> List[Optional[float]]:
+    """
+    Interpolates a series on to the step grid, with `None` outside the steps of the series
+    """
+    if track is None:
+        return [None] * len(grid)
+
+    s = Series(has_pyramid=True).load(track, copy=False)
+    step, value, gap = s.select_range(grid[0], grid[-1], len(grid) * OVERSAMPLING)
+    if len(step) == 0:
+        return [None] * len(grid)
+
+    # steps are bucket means, so the series starts up to a bucket before the first one
+    aligned = np.interp(grid, step, value)
+    aligned[(grid < step[0] - gap) | (grid > s.last_step[-1])] = np.nan
+
+    return [None if v != v else v for v in aligned.tolist()]
+
+
+def _stream_aligned(run_uuids: List[str], indicators: List[str], start: Optional[float], end: Optional[float],
+                    points: int) -> Iterator[str]:
+    """
+    Streams the step grid and then one run at a time, so that only one run's series are in memory.
+    Without an `end`, the metrics of all runs are loaded to find the last step,
+     and each is dropped once its run is streamed.
+    """
+    metrics_keys = {run_uuid: MetricsIndex.get(run_uuid) for run_uuid in run_uuids}
+    metrics: Dict[str, MetricsModel] = {}
+    if start is None:
+        start = 0.
+    if end is None:
+        metrics = {run_uuid: key.load() for run_uuid, key in metrics_keys.items() if key}
+        end = max([m.step for m in metrics.values()] + [start])
+    grid = np.linspace(start, end, points) if end > start else np.array([start])
+
+    yield f'{{"step": {json.dumps(grid.tolist())}, "runs": ['
+
+    for i, run_uuid in enumerate(run_uuids):
+        series = []
+        m = metrics.pop(run_uuid, None)
+        if m is None and metrics_keys[run_uuid]:
+            m = metrics_keys[run_uuid].load()
+        if m is not None:
+            for ind in indicators:
+                series.append({'name': ind, 'value': _align(m.get_series(ind), grid)})
+
+        yield (',' if i > 0 else '') + json.dumps({'run_uuid': run_uuid, 'series': series})
+
+    yield ']}'
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _is_str_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def _get_request_error(data: Any) -> Optional[str]:
+    if not isinstance(data, dict):
+        return 'request body should be a JSON object'
+    if not _is_str_list(data.get('run_uuids', None)):
+        return 'run_uuids should be a list of strings'
+    if len(data['run_uuids']) > MAX_RUNS:
+        return f'at most {MAX_RUNS} runs can be compared'
+    if not _is_str_list(data.get('indicators', None)):
+        return 'indicators should be a list of strings'
+    for k in ['start', 'end']:
+        if data.get(k, None) is not None and not _is_number(data[k]):
+            return f'{k} should be a number'
+    if data.get('start', None) is not None and data.get('end', None) is not None and data['start'] > data['end']:
+        return 'start should not be after end'
+    points = data.get('points', RANGE_POINTS)
+    if not isinstance(points, int) or isinstance(points, bool) or not 1 <= points <= MAX_RANGE_POINTS:
+        return f'points should be an integer from 1 to {MAX_RANGE_POINTS}'
+
+    return None
+
+
+@Analysis.route('POST', 'compare/series')
+async def get_aligned_series(request: Request) -> Any:
+    """
+    Metrics of several runs, interpolated on a common grid of `points` steps in `[start, end]`.
+    The range defaults to `0` and the last step of the runs.
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+
+    error = _get_request_error(data)
+    if error:
+        response = JSONResponse({'error': error})
+        response.status_code = 400
+
+        return response
+
+    return StreamingResponse(_stream_aligned(data['run_uuids'], data['indicators'], data.get('start', None),
+                                             data.get('end', None), data.get('points', RANGE_POINTS)),
+                             media_type='application/json')
@@ -11,10 +11,12 @@ from labml_app import enums
 from labml_app import settings
 from ..analysis import Analysis
 from ..series import SeriesModel, Series
-from ..series_collection import SeriesCollection
+from ..series_collection import SeriesCollection, STATISTICS
 from ..preferences import Preferences
 from .. import helper
 
+TOP_K = 10
+
 
 @Analysis.db_model(PickleSerializer, 'gradients')
 class GradientsModel(Model['GradientsModel'], SeriesCollection):
@@ -39,6 +41,8 @@ class GradientsIndex(Index['Gradients']):
 class GradientsAnalysis(Analysis):
     gradients: GradientsModel
 
+    indicator_types = [enums.SeriesEnums.GRAD]
+
     def __init__(self, data):
         self.gradients = data
 
@@ -59,9 +63,11 @@ class GradientsAnalysis(Analysis):
         self.gradients.track(res)
 
     def get_tracking(self):
+        return self.gradients.get_cached('tracking', self._get_tracking)
+
+    def _get_tracking(self):
         res = []
-        is_series_updated = False
-        for ind, track in self.gradients.tracking.items():
+        for ind, track in self.gradients.get_all_series().items():
             name = ind.split('.')
             if name[-1] != 'l2':
                 continue
@@ -71,34 +77,31 @@ class GradientsAnalysis(Analysis):
             series: Dict[str, Any] = s.detail
             series['name'] = '.'.join(name)
 
-            if s.is_smoothed_updated:
-                self.gradients.tracking[ind] = s.to_data()
-                is_series_updated = True
-
             res.append(series)
 
-        if is_series_updated:
-            self.gradients.save()
-
         res.sort(key=lambda s: s['mean'], reverse=True)
 
         helper.remove_common_prefix(res, 'name')
 
         return res
 
+    def get_top(self, kind: str, statistic: str, k: int):
+        return helper.get_top_summaries(self.gradients.get_summaries(), kind, statistic, k)
+
     def get_track_summaries(self):
+        return self.gradients.get_cached('track_summaries', self._get_track_summaries)
+
+    def _get_track_summaries(self):
         data = {}
-        for ind, track in self.gradients.tracking.items():
+        for ind, summary in self.gradients.get_summaries().items():
             name_split = ind.split('.')
             ind = name_split[-1]
             name = '.'.join(name_split[1:-1])
 
-            series: Dict[str, Any] = Series().load(track).summary
-
             if name in data:
-                data[name][ind] = series['mean']
+                data[name][ind] = summary['mean']
             else:
-                data[name] = {ind: series['mean']}
+                data[name] = {ind: summary['mean']}
 
         if not data:
             return []
@@ -143,6 +146,7 @@ class GradientsAnalysis(Analysis):
         if gradients_key:
             g: GradientsModel = gradients_key.load()
             GradientsIndex.delete(run_uuid)
+            g.delete_series()
             g.delete()
 
         if preferences_key:
@@ -169,6 +173,44 @@ def get_grads_tracking(request: Request, run_uuid: str) -> Any:
     return response
 
 
+@Analysis.route('GET', 'gradients/top/{run_uuid}')
+def get_grads_top(request: Request, run_uuid: str) -> Any:
+    """
+    Top `k` layers by a `statistic` of their `kind` series, without loading the series
+    """
+    kind = request.query_params.get('kind', 'l2')
+    statistic = request.query_params.get('statistic', 'mean')
+    try:
+        k = int(request.query_params.get('k', TOP_K))
+    except ValueError:
+        k = -1
+
+    if k < 0:
+        response = JSONResponse({'error': 'k should be a non-negative integer'})
+        response.status_code = 400
+
+        return response
+
+    if statistic not in STATISTICS:
+        response = JSONResponse({'error': f'unknown statistic: {statistic}'})
+        response.status_code = 400
+
+        return response
+
+    top_data = []
+    status_code = 404
+
+    ans = GradientsAnalysis.get_or_create(run_uuid)
+    if ans:
+        top_data = ans.get_top(kind, statistic, k)
+        status_code = 200
+
+    response = JSONResponse({'series': top_data})
+    response.status_code = status_code
+
+    return response
+
+
 @Analysis.route('GET', 'gradients/preferences/{run_uuid}')
 def get_grads_preferences(request: Request, run_uuid: str) -> Any:
     preferences_data = {}
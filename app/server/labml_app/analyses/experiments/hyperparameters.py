@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from typing import Dict, Any, List, Union
 
 from fastapi import Request
@@ -8,6 +9,8 @@ from labml_db.serializer.pickle import PickleSerializer
 from labml_app.logger import logger
 from labml_app.enums import SeriesEnums
 from labml_app import auth
+from labml_app.db import locks
+from labml_app.utils import executors
 from ..series import Series
 from ..analysis import Analysis
 from ..series import SeriesModel
@@ -83,8 +86,11 @@ class HyperParamsIndex(Index['HyperParams']):
 class HyperParamsAnalysis(Analysis):
     hyper_params: HyperParamsModel
 
-    def __init__(self, data):
+    indicator_types = [SeriesEnums.HYPERPARAMS]
+
+    def __init__(self, data, run_uuid: str):
         self.hyper_params = data
+        self.run_uuid = run_uuid
 
     def track(self, data: Dict[str, SeriesModel]):
         res = {}
@@ -98,7 +104,7 @@ class HyperParamsAnalysis(Analysis):
     def get_tracking(self):
         res = []
         default_values = self.hyper_params.default_values
-        for ind, track in self.hyper_params.tracking.items():
+        for ind, track in self.hyper_params.get_all_series().items():
             name_split = ind.split('.')
             name = ''.join(name_split[-1])
 
@@ -167,9 +173,9 @@ class HyperParamsAnalysis(Analysis):
             hpp.save()
             HyperParamsPreferencesIndex.set(run_uuid, hpp.key)
 
-            return HyperParamsAnalysis(hp)
+            return HyperParamsAnalysis(hp, run_uuid)
 
-        return HyperParamsAnalysis(hyper_params_key.load())
+        return HyperParamsAnalysis(hyper_params_key.load(), run_uuid)
 
     @staticmethod
     def delete(run_uuid: str):
@@ -179,6 +185,7 @@ class HyperParamsAnalysis(Analysis):
         if hyper_params_key:
             hp: HyperParamsModel = hyper_params_key.load()
             HyperParamsIndex.delete(run_uuid)
+            hp.delete_series()
             hp.delete()
 
         if preferences_key:
@@ -186,27 +193,37 @@ class HyperParamsAnalysis(Analysis):
             HyperParamsPreferencesIndex.delete(run_uuid)
             gp.delete()
 
-    def set_hyper_params(self, data: Dict[str, any]) -> None:
-        hp_values = self.hyper_params.hp_values
-
-        for k, v in data.items():
-            if k not in hp_values:
-                continue
+    @contextmanager
+    def _update(self):
+        """
+        Reloads the hyper-parameters and saves them after the changes, under the lock that `track` runs under.
+        Otherwise saving them could revert series and summaries added by `track` in the meantime.
+        """
+        with locks.lock(self.run_uuid):
+            self.hyper_params = self.hyper_params.key.load()
+            yield self.hyper_params
+            self.hyper_params.save()
 
-            try:
-                new_value = float(v)
-                current_value = hp_values[k]
+    def set_hyper_params(self, data: Dict[str, any]) -> None:
+        with self._update() as hyper_params:
+            hp_values = hyper_params.hp_values
 
-                if current_value and current_value == new_value:
+            for k, v in data.items():
+                if k not in hp_values:
                     continue
 
-                hp_values[k] = new_value
-                self.update_hp_series(k, new_value)
-                self.hyper_params.has_hp_updated[k] = True
-            except ValueError:
-                logger.error(f'not a number : {v}')
+                try:
+                    new_value = float(v)
+                    current_value = hp_values[k]
+
+                    if current_value and current_value == new_value:
+                        continue
 
-        self.hyper_params.save()
+                    hp_values[k] = new_value
+                    self.update_hp_series(k, new_value)
+                    hyper_params.has_hp_updated[k] = True
+                except ValueError:
+                    logger.error(f'not a number : {v}')
 
     def update_hp_series(self, ind: str, value: float) -> None:
         hp_series = self.hyper_params.hp_series
@@ -225,19 +242,21 @@ class HyperParamsAnalysis(Analysis):
             default_values[k] = v
             hp_values[k] = v['default']
 
-        self.hyper_params.default_values = default_values
-        self.hyper_params.hp_values = hp_values
-        self.hyper_params.save()
+        with self._update() as hyper_params:
+            hyper_params.default_values = default_values
+            hyper_params.hp_values = hp_values
 
     def get_hyper_params(self):
         res = {}
-        has_hp_updated = self.hyper_params.has_hp_updated
-        for k, v in self.hyper_params.hp_values.items():
-            if has_hp_updated.get(k, False):
-                res[k] = v
-                has_hp_updated[k] = False
+        if not any(self.hyper_params.has_hp_updated.values()):
+            return res
 
-                self.hyper_params.save()
+        with self._update() as hyper_params:
+            has_hp_updated = hyper_params.has_hp_updated
+            for k, v in hyper_params.hp_values.items():
+                if has_hp_updated.get(k, False):
+                    res[k] = v
+                    has_hp_updated[k] = False
 
         return res
 
@@ -296,6 +315,6 @@ async def set_hyper_params(request: Request, run_uuid: str) -> Any:
     ans = HyperParamsAnalysis.get_or_create(run_uuid)
     if ans:
         json = await request.json()
-        ans.set_hyper_params(json)
+        await executors.run_db(ans.set_hyper_params, json)
 
     return {'errors': []}
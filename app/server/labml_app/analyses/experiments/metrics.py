@@ -1,4 +1,5 @@
-from typing import Dict, Any
+import math
+from typing import Dict, Any, Optional, Tuple
 
 from fastapi import Request
 from fastapi.responses import JSONResponse
@@ -14,10 +15,13 @@ from ..series_collection import SeriesCollection
 from ..preferences import Preferences
 from labml_app.settings import INDICATOR_LIMIT
 
+RANGE_POINTS = 512
+MAX_RANGE_POINTS = RANGE_POINTS * 4
+
 
 @Analysis.db_model(PickleSerializer, 'metrics')
 class MetricsModel(Model['MetricsModel'], SeriesCollection):
-    pass
+    has_pyramid = True
 
 
 @Analysis.db_model(PickleSerializer, 'metrics_preferences')
@@ -41,6 +45,15 @@ class MetricsAnalysis(Analysis):
     def __init__(self, data):
         self.metrics = data
 
+    @classmethod
+    def select_indicators(cls, data_by_type: Dict[str, Dict[str, SeriesModel]]) -> Dict[str, SeriesModel]:
+        res = {}
+        for ind_type, data in data_by_type.items():
+            if ind_type not in INDICATORS:
+                res.update(data)
+
+        return res
+
     def track(self, data: Dict[str, SeriesModel]):
         res = {}
         for ind, s in data.items():
@@ -57,23 +70,31 @@ class MetricsAnalysis(Analysis):
         self.metrics.track(res)
 
     def get_tracking(self):
+        return self.metrics.get_cached('tracking', self._get_tracking)
+
+    def _get_tracking(self):
         res = []
-        is_series_updated = False
-        for ind, track in self.metrics.tracking.items():
+        for ind, track in self.metrics.get_all_series().items():
             name = ind.split('.')
 
             s = Series().load(track)
             series: Dict[str, Any] = s.detail
             series['name'] = '.'.join(name)
 
-            if s.is_smoothed_updated:
-                self.metrics.tracking[ind] = s.to_data()
-                is_series_updated = True
-
             res.append(series)
 
-        if is_series_updated:
-            self.metrics.save()
+        res.sort(key=lambda s: s['name'])
+
+        return res
+
+    def get_range(self, start: Optional[float], end: Optional[float], points: int):
+        res = []
+        for ind, track in self.metrics.get_all_series().items():
+            # range queries don't change the series, so it can use the loaded data
+            series: Dict[str, Any] = Series(has_pyramid=True).load(track, copy=False).get_range(start, end, points)
+            series['name'] = ind
+
+            res.append(series)
 
         res.sort(key=lambda s: s['name'])
 
@@ -104,6 +125,7 @@ class MetricsAnalysis(Analysis):
         if metrics_key:
             m: MetricsModel = metrics_key.load()
             MetricsIndex.delete(run_uuid)
+            m.delete_series()
             m.delete()
 
         if preferences_key:
@@ -112,15 +134,67 @@ class MetricsAnalysis(Analysis):
             mp.delete()
 
 
+def _is_range_query(request: Request) -> bool:
+    return any(k in request.query_params for k in ['start', 'end', 'points'])
+
+
+def _get_step_param(request: Request, name: str) -> Optional[float]:
+    value = request.query_params.get(name, None)
+    if value is None:
+        return None
+
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValueError(f'{name} should be a number')
+    if not math.isfinite(value):
+        raise ValueError(f'{name} should be a finite number')
+
+    return value
+
+
+def _get_range_params(request: Request) -> Tuple[Optional[float], Optional[float], int]:
+    """
+    `start` and `end` are steps, and `points` is the maximum number of points per series.
+    Raises `ValueError` with a message for the response if they are invalid.
+    """
+    start = _get_step_param(request, 'start')
+    end = _get_step_param(request, 'end')
+    if start is not None and end is not None and start > end:
+        raise ValueError('start should not be after end')
+
+    try:
+        points = int(request.query_params.get('points', RANGE_POINTS))
+    except ValueError:
+        points = 0
+    if not 1 <= points <= MAX_RANGE_POINTS:
+        raise ValueError(f'points should be an integer from 1 to {MAX_RANGE_POINTS}')
+
+    return start, end, points
+
+
 # @utils.mix_panel.MixPanelEvent.time_this(None)
 @Analysis.route('GET', 'metrics/{run_uuid}')
 def get_metrics_tracking(request: Request, run_uuid: str) -> Any:
     track_data = []
     status_code = 404
 
+    range_params = None
+    if _is_range_query(request):
+        try:
+            range_params = _get_range_params(request)
+        except ValueError as e:
+            response = JSONResponse({'error': str(e)})
+            response.status_code = 400
+
+            return response
+
     ans = MetricsAnalysis.get_or_create(run_uuid)
     if ans:
-        track_data = ans.get_tracking()
+        if range_params is not None:
+            track_data = ans.get_range(*range_params)
+        else:
+            track_data = ans.get_tracking()
         status_code = 200
 
     response = JSONResponse({'series': track_data, 'insights': []})
@@ -11,10 +11,12 @@ from labml_app.enums import SeriesEnums
 from labml_app.settings import INDICATOR_LIMIT
 from ..analysis import Analysis
 from ..series import SeriesModel, Series
-from ..series_collection import SeriesCollection
+from ..series_collection import SeriesCollection, STATISTICS
 from ..preferences import Preferences
 from .. import helper
 
+TOP_K = 10
+
 
 @Analysis.db_model(PickleSerializer, 'outputs')
 class OutputsModel(Model['OutputsModel'], SeriesCollection):
@@ -39,6 +41,8 @@ class OutputsIndex(Index['Outputs']):
 class OutputsAnalysis(Analysis):
     outputs: OutputsModel
 
+    indicator_types = [SeriesEnums.MODULE]
+
     def __init__(self, data):
         self.outputs = data
 
@@ -58,19 +62,23 @@ class OutputsAnalysis(Analysis):
 
         self.outputs.track(res)
 
+    def get_top(self, kind: str, statistic: str, k: int):
+        return helper.get_top_summaries(self.outputs.get_summaries(), kind, statistic, k)
+
     def get_track_summaries(self):
+        return self.outputs.get_cached('track_summaries', self._get_track_summaries)
+
+    def _get_track_summaries(self):
         data = {}
-        for ind, track in self.outputs.tracking.items():
+        for ind, summary in self.outputs.get_summaries().items():
             name_split = ind.split('.')
             ind = name_split[-1]
             name = '.'.join(name_split[1:-1])
 
-            series: Dict[str, Any] = Series().load(track).summary
-
             if name in data:
-                data[name][ind] = series['mean']
+                data[name][ind] = summary['mean']
             else:
-                data[name] = {ind: series['mean']}
+                data[name] = {ind: summary['mean']}
 
         if not data:
             return []
@@ -91,9 +99,11 @@ class OutputsAnalysis(Analysis):
         return [v for k, v in ret.items()]
 
     def get_tracking(self):
+        return self.outputs.get_cached('tracking', self._get_tracking)
+
+    def _get_tracking(self):
         res = []
-        is_series_updated = False
-        for ind, track in self.outputs.tracking.items():
+        for ind, track in self.outputs.get_all_series().items():
             name = ind.split('.')
             if name[-1] != 'var':
                 continue
@@ -103,15 +113,8 @@ class OutputsAnalysis(Analysis):
             series: Dict[str, Any] = s.detail
             series['name'] = '.'.join(name)
 
-            if s.is_smoothed_updated:
-                self.outputs.tracking[ind] = s.to_data()
-                is_series_updated = True
-
             res.append(series)
 
-        if is_series_updated:
-            self.outputs.save()
-
         res.sort(key=lambda s: s['mean'], reverse=True)
 
         helper.remove_common_prefix(res, 'name')
@@ -143,6 +146,7 @@ class OutputsAnalysis(Analysis):
         if outputs_key:
             o: OutputsModel = outputs_key.load()
             OutputsIndex.delete(run_uuid)
+            o.delete_series()
             o.delete()
 
         if preferences_key:
@@ -170,6 +174,44 @@ def get_modules_tracking(request: Request, run_uuid: str) -> Any:
     return response
 
 
+@Analysis.route('GET', 'outputs/top/{run_uuid}')
+def get_outputs_top(request: Request, run_uuid: str) -> Any:
+    """
+    Top `k` layers by a `statistic` of their `kind` series, without loading the series
+    """
+    kind = request.query_params.get('kind', 'var')
+    statistic = request.query_params.get('statistic', 'mean')
+    try:
+        k = int(request.query_params.get('k', TOP_K))
+    except ValueError:
+        k = -1
+
+    if k < 0:
+        response = JSONResponse({'error': 'k should be a non-negative integer'})
+        response.status_code = 400
+
+        return response
+
+    if statistic not in STATISTICS:
+        response = JSONResponse({'error': f'unknown statistic: {statistic}'})
+        response.status_code = 400
+
+        return response
+
+    top_data = []
+    status_code = 404
+
+    ans = OutputsAnalysis.get_or_create(run_uuid)
+    if ans:
+        top_data = ans.get_top(kind, statistic, k)
+        status_code = 200
+
+    response = JSONResponse({'series': top_data})
+    response.status_code = status_code
+
+    return response
+
+
 @Analysis.route('GET', 'outputs/preferences/{run_uuid}')
 def get_modules_preferences(request: Request, run_uuid: str) -> Any:
     preferences_data = {}
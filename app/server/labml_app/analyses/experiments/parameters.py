@@ -12,10 +12,12 @@ from labml_app.enums import SeriesEnums
 from labml_app.settings import INDICATOR_LIMIT
 from ..analysis import Analysis
 from ..series import SeriesModel, Series
-from ..series_collection import SeriesCollection
+from ..series_collection import SeriesCollection, STATISTICS
 from ..preferences import Preferences
 from .. import helper
 
+TOP_K = 10
+
 
 @Analysis.db_model(PickleSerializer, 'parameters')
 class ParametersModel(Model['ParametersModel'], SeriesCollection):
@@ -40,6 +42,8 @@ class ParametersIndex(Index['Parameters']):
 class ParametersAnalysis(Analysis):
     parameters: ParametersModel
 
+    indicator_types = [SeriesEnums.PARAM]
+
     def __init__(self, data):
         self.parameters = data
 
@@ -58,19 +62,23 @@ class ParametersAnalysis(Analysis):
 
         self.parameters.track(res)
 
+    def get_top(self, kind: str, statistic: str, k: int):
+        return helper.get_top_summaries(self.parameters.get_summaries(), kind, statistic, k)
+
     def get_track_summaries(self):
+        return self.parameters.get_cached('track_summaries', self._get_track_summaries)
+
+    def _get_track_summaries(self):
         data = {}
-        for ind, track in self.parameters.tracking.items():
+        for ind, summary in self.parameters.get_summaries().items():
             name_split = ind.split('.')
             ind = name_split[-1]
             name = '.'.join(name_split[1:-1])
 
-            series: Dict[str, Any] = Series().load(track).summary
-
             if name in data:
-                data[name][ind] = series['mean']
+                data[name][ind] = summary['mean']
             else:
-                data[name] = {ind: series['mean']}
+                data[name] = {ind: summary['mean']}
 
         if not data:
             return []
@@ -91,9 +99,11 @@ class ParametersAnalysis(Analysis):
         return [v for k, v in ret.items()]
 
     def get_tracking(self):
+        return self.parameters.get_cached('tracking', self._get_tracking)
+
+    def _get_tracking(self):
         res = []
-        is_series_updated = False
-        for ind, track in self.parameters.tracking.items():
+        for ind, track in self.parameters.get_all_series().items():
             name = ind.split('.')
             if name[-1] != 'l2':
                 continue
@@ -103,15 +113,8 @@ class ParametersAnalysis(Analysis):
             series: Dict[str, Any] = s.detail
             series['name'] = '.'.join(name)
 
-            if s.is_smoothed_updated:
-                self.parameters.tracking[ind] = s.to_data()
-                is_series_updated = True
-
             res.append(series)
 
-        if is_series_updated:
-            self.parameters.save()
-
         res.sort(key=lambda s: s['mean'], reverse=True)
 
         helper.remove_common_prefix(res, 'name')
@@ -143,6 +146,7 @@ class ParametersAnalysis(Analysis):
         if parameters_key:
             p: ParametersModel = parameters_key.load()
             ParametersIndex.delete(run_uuid)
+            p.delete_series()
             p.delete()
 
         if preferences_key:
@@ -170,6 +174,44 @@ def get_params_tracking(request: Request, run_uuid: str) -> Any:
     return response
 
 
+@Analysis.route('GET', 'parameters/top/{run_uuid}')
+def get_params_top(request: Request, run_uuid: str) -> Any:
+    """
+    Top `k` layers by a `statistic` of their `kind` series, without loading the series
+    """
+    kind = request.query_params.get('kind', 'l2')
+    statistic = request.query_params.get('statistic', 'mean')
+    try:
+        k = int(request.query_params.get('k', TOP_K))
+    except ValueError:
+        k = -1
+
+    if k < 0:
+        response = JSONResponse({'error': 'k should be a non-negative integer'})
+        response.status_code = 400
+
+        return response
+
+    if statistic not in STATISTICS:
+        response = JSONResponse({'error': f'unknown statistic: {statistic}'})
+        response.status_code = 400
+
+        return response
+
+    top_data = []
+    status_code = 404
+
+    ans = ParametersAnalysis.get_or_create(run_uuid)
+    if ans:
+        top_data = ans.get_top(kind, statistic, k)
+        status_code = 200
+
+    response = JSONResponse({'series': top_data})
+    response.status_code = status_code
+
+    return response
+
+
 @Analysis.route('GET', 'parameters/preferences/{run_uuid}')
 def get_params_preferences(request: Request, run_uuid: str) -> Any:
     preferences_data = {}
@@ -1,3 +1,4 @@
+import heapq
 import math
 from typing import List, Dict, Any
 
@@ -51,3 +52,17 @@ def get_mean_series(res: List[Dict[str, Any]]) -> Dict[str, Any]:
     step = res[0]['step']
 
     return {'step': step, 'value': mean_value, 'smoothed': mean_smoothed, 'name': 'mean'}
+
+
+def get_top_summaries(summaries: Dict[str, Dict[str, float]], kind: str, statistic: str,
+                      k: int) -> List[Dict[str, Any]]:
+    """
+    Top `k` series of a `kind`, such as `l2`, by a statistic of the series
+    """
+    inds = [ind for ind in summaries if ind.split('.')[-1] == kind]
+    inds = heapq.nlargest(k, inds, key=lambda ind: summaries[ind][statistic])
+
+    res = [{'name': '.'.join(ind.split('.')[1:-1]), **summaries[ind]} for ind in inds]
+    remove_common_prefix(res, 'name')
+
+    return res
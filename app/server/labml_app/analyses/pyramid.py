@@ -0,0 +1,183 @@
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+N_LEVELS = 5
+LEVEL_FACTOR = 8
+LEVEL_LENGTH = 512
+
+Pyramid = Dict[str, Any]
+Level = Dict[str, Any]
+
+
+def create(is_partial: bool = False) -> Pyramid:
+    """
+    A pyramid keeps several resolutions of the recent points of a series.
+    Level `0` has the raw points, and each next level averages points into buckets
+     `LEVEL_FACTOR` times wider.
+    Every level keeps at most `LEVEL_LENGTH` points, dropping the oldest,
+     so coarser levels reach further back.
+    The coarsest level keeps the whole series instead; it doubles its bucket width when it fills up,
+     and keeps the size of each bucket for that.
+    Other levels only keep the size of the last bucket, since later points can only add to that one.
+    Bucket widths are set from the step gap of the first update.
+    `is_partial` is for series that already had points, so levels don't have the start of the series.
+    """
+    return {'levels': [], 'last_step': None, 'is_partial': is_partial}
+
+
+def _create_level(gap: float, is_trimmed: bool, is_coarsest: bool = False) -> Level:
+    level = {
+        'gap': gap,
+        'step': np.array([]),
+        'value': np.array([]),
+        'last_id': None,
+        'last_count': 0,
+        'is_trimmed': is_trimmed,
+    }
+    if is_coarsest:
+        level['count'] = np.array([])
+
+    return level
+
+
+def _create_levels(step: np.ndarray, is_partial: bool) -> List[Level]:
+    if len(step) > 1:
+        gap = max(1., np.median(np.diff(step)).item())
+    else:
+        gap = 1.
+
+    levels = [_create_level(0., is_partial)]
+    for i in range(1, N_LEVELS):
+        gap *= LEVEL_FACTOR
+        levels.append(_create_level(gap, is_partial, i == N_LEVELS - 1))
+
+    return levels
+
+
+def _halve(level: Level) -> None:
+    """
+    Merges pairs of buckets of the coarsest level by doubling the bucket width.
+    Buckets of a width are nested in buckets of twice the width, so the merged means are exact.
+    """
+    gap = level['gap'] * 2
+    ids = np.floor(level['step'] / gap)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    count = np.add.reduceat(level['count'], starts)
+
+    level['gap'] = gap
+    level['step'] = np.add.reduceat(level['step'] * level['count'], starts) / count
+    level['value'] = np.add.reduceat(level['value'] * level['count'], starts) / count
+    level['count'] = count
+    level['last_id'] = ids[-1].item()
+    level['last_count'] = count[-1].item()
+
+
+def _trim(level: Level) -> None:
+    if 'count' in level:
+        while len(level['step']) > LEVEL_LENGTH:
+            _halve(level)
+    elif len(level['step']) > LEVEL_LENGTH:
+        for k in ['step', 'value']:
+            level[k] = level[k][-LEVEL_LENGTH:]
+        level['is_trimmed'] = True
+
+
+def _update_level(level: Level, step: np.ndarray, value: np.ndarray) -> None:
+    if level['gap'] == 0:
+        level['step'] = np.concatenate((level['step'], step))
+        level['value'] = np.concatenate((level['value'], value))
+        _trim(level)
+        return
+
+    ids = np.floor(step / level['gap'])
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    count = np.diff(np.r_[starts, len(ids)]).astype(float)
+    step_sum = np.add.reduceat(step, starts)
+    value_sum = np.add.reduceat(value, starts)
+
+    if level['last_id'] == ids[0]:
+        n = level['last_count']
+        step_sum[0] += level['step'][-1] * n
+        value_sum[0] += level['value'][-1] * n
+        count[0] += n
+        level['step'] = level['step'][:-1]
+        level['value'] = level['value'][:-1]
+        if 'count' in level:
+            level['count'] = level['count'][:-1]
+
+    level['step'] = np.concatenate((level['step'], step_sum / count))
+    level['value'] = np.concatenate((level['value'], value_sum / count))
+    if 'count' in level:
+        level['count'] = np.concatenate((level['count'], count))
+    level['last_id'] = ids[-1].item()
+    level['last_count'] = count[-1].item()
+    _trim(level)
+
+
+def update(pyramid: Pyramid, step: np.ndarray, value: np.ndarray) -> None:
+    """
+    Adds points to all levels.
+    Points at steps before the last added step are ignored, so that levels stay sorted.
+    """
+    if pyramid['last_step'] is not None:
+        is_new = step >= pyramid['last_step']
+        step, value = step[is_new], value[is_new]
+    if len(step) == 0:
+        return
+
+    if not pyramid['levels']:
+        pyramid['levels'] = _create_levels(step, pyramid['is_partial'])
+
+    for level in pyramid['levels']:
+        _update_level(level, step, value)
+
+    pyramid['last_step'] = step[-1].item()
+
+
+def _downsample(step: np.ndarray, value: np.ndarray, points: int):
+    if len(step) <= points:
+        return step, value
+
+    starts = np.linspace(0, len(step), points, endpoint=False).astype(int)
+    count = np.diff(np.r_[starts, len(step)])
+
+    return np.add.reduceat(step, starts) / count, np.add.reduceat(value, starts) / count
+
+
+def _count(step: np.ndarray, start: Optional[float], end: Optional[float]) -> int:
+    lo = 0 if start is None else np.searchsorted(step, start, side='left')
+    hi = len(step) if end is None else np.searchsorted(step, end, side='right')
+
+    return hi - lo
+
+
+def select_level(pyramid: Optional[Pyramid], start: Optional[float], end: Optional[float],
+                 points: int) -> Optional[Level]:
+    """
+    Returns the finest level that has all points from `start` and at most `points` points in the range.
+    If the coarsest such level has more points, it is returned to be downsampled.
+    Returns `None` if the range starts before all levels.
+    """
+    if not pyramid:
+        return None
+
+    res = None
+    for level in pyramid['levels']:
+        if level['is_trimmed'] and (start is None or len(level['step']) == 0 or level['step'][0] > start):
+            continue
+        res = level
+        if _count(level['step'], start, end) <= points:
+            break
+
+    return res
+
+
+def get_range(step: np.ndarray, value: np.ndarray, start: Optional[float], end: Optional[float], points: int):
+    """
+    Points of sorted `step` and `value` in `[start, end]`, averaged down to at most `points`
+    """
+    lo = 0 if start is None else np.searchsorted(step, start, side='left')
+    hi = len(step) if end is None else np.searchsorted(step, end, side='right')
+
+    return _downsample(step[lo:hi], value[lo:hi], points)
@@ -1,8 +1,16 @@
 import math
-from typing import Dict, List, Optional, Union
+from copy import deepcopy
+from typing import Dict, List, Optional, Union, Tuple
 
 import numpy as np
 
+from . import pyramid
+
+try:
+    import labml_fast_merge
+except ImportError:
+    labml_fast_merge = None
+
 MAX_BUFFER_LENGTH = 1024
 SMOOTH_POINTS = 50
 MIN_SMOOTH_POINTS = 1
@@ -11,46 +19,96 @@ OUTLIER_MARGIN = 0.04
 SeriesModel = Dict[str, Union[np.ndarray, List[float], float]]
 
 
+def _get_buffer(array: np.ndarray) -> np.ndarray:
+    """
+    Arrays returned by `Series.to_data` are views of a larger buffer.
+    Reuse that buffer instead of copying, so that appends don't reallocate.
+    """
+    base = array.base
+    if (isinstance(base, np.ndarray) and base.ndim == 1 and base.dtype == array.dtype
+            and base.ctypes.data == array.ctypes.data):
+        return base
+
+    return array.copy()
+
+
+def _grow(buffer: np.ndarray, size: int, capacity: int) -> np.ndarray:
+    res = np.empty(capacity)
+    res[:size] = buffer[:size]
+
+    return res
+
+
 class Series:
-    step: np.ndarray
-    last_step: np.ndarray
-    value: np.ndarray
+    _step: np.ndarray
+    _last_step: np.ndarray
+    _value: np.ndarray
+    _size: int
     smoothed: List[float]
     is_smoothed_updated: bool
     step_gap: float
     max_buffer_length: int
-
-    def __init__(self, max_buffer_length: int = None):
-        self.step = np.array([])
-        self.last_step = np.array([])
-        self.value = np.array([])
+    extent: Optional[List[float]]
+    pyramid: Optional[pyramid.Pyramid]
+
+    def __init__(self, max_buffer_length: int = None, has_pyramid: bool = False):
+        """
+        Only series with `has_pyramid` keep a pyramid of recent points for range queries
+        """
+        self._step = np.array([])
+        self._last_step = np.array([])
+        self._value = np.array([])
+        self._size = 0
         self.smoothed = []
         self.is_smoothed_updated = False
         self.step_gap = 0
+        self.extent = None
+        self.pyramid = pyramid.create() if has_pyramid else None
         if max_buffer_length:
             self.max_buffer_length = max_buffer_length
         else:
             self.max_buffer_length = MAX_BUFFER_LENGTH
 
-        try:
-            import labml_fast_merge
-            def _merge_new(self,
-                           values: np.ndarray,
-                           last_step: np.ndarray,
-                           steps: np.ndarray,
-                           prev_last_step: int = 0,
-                           i: int = 0):  # from_step
-
-                return labml_fast_merge.merge(values,
-                                              last_step,
-                                              steps,
-                                              float(self.step_gap),
-                                              float(prev_last_step),
-                                              i)
-
-            self._merge = _merge_new
-        except ImportError:
+        if labml_fast_merge is not None:
+            self._merge = self._merge_fast
+            self._remove_nan = self._remove_nan_fast
+            self._smooth_value = self._smooth_value_fast
+            self._mean_angle = self._mean_angle_fast
+            self._get_extent = self._get_extent_fast
+        else:
             self._merge = self._merge_old
+            self._remove_nan = self._remove_nan_old
+            self._smooth_value = self._smooth_value_np
+            self._mean_angle = self._mean_angle_np
+            self._get_extent = self._get_extent_np
+
+    @property
+    def step(self) -> np.ndarray:
+        return self._step[:self._size]
+
+    @step.setter
+    def step(self, step: np.ndarray):
+        self._step = step
+        self._size = len(step)
+
+    @property
+    def last_step(self) -> np.ndarray:
+        return self._last_step[:self._size]
+
+    @last_step.setter
+    def last_step(self, last_step: np.ndarray):
+        self._last_step = last_step
+        self._size = len(last_step)
+
+    @property
+    def value(self) -> np.ndarray:
+        return self._value[:self._size]
+
+    @value.setter
+    def value(self, value: np.ndarray):
+        self._value = value
+        self._size = len(value)
+        self.extent = None
 
     @property
     def last_value(self) -> float:
@@ -75,6 +133,7 @@ class Series:
             'value': self.value.tolist(),
             'smoothed': self.smoothed,
             'mean': np.mean(self.value),
+            'extent': self.get_extent(True),
         }
 
     @property
@@ -84,29 +143,33 @@ class Series:
         }
 
     def to_data(self) -> SeriesModel:
-        return {
+        data = {
             'step': self.step,
             'value': self.value,
             'last_step': self.last_step,
             'smoothed': self.smoothed,
             'is_smoothed_updated': self.is_smoothed_updated,
-            'step_gap': self.step_gap
+            'step_gap': self.step_gap,
+            'extent': self.extent,
         }
+        if self.pyramid is not None:
+            data['pyramid'] = self.pyramid
+
+        return data
 
     def __len__(self):
-        return len(self.last_step)
+        return self._size
 
     def update(self, step: List[float], value: List[float]) -> None:
-        prev_size = len(self.value)
-        value = np.array(value)
-        step = np.array(step)
-        last_step = np.array(step)
+        prev_size = len(self)
+        value = np.array(value, dtype=float)
+        self.extent = None
 
         self._remove_nan(value)
 
-        self.value = np.concatenate((self.value, value))
-        self.step = np.concatenate((self.step, step))
-        self.last_step = np.concatenate((self.last_step, last_step))
+        if self.pyramid is not None:
+            pyramid.update(self.pyramid, np.asarray(step, dtype=float), value)
+        self._append(step, value)
 
         self.step_gap = self.find_step_gap()
 
@@ -118,7 +181,29 @@ class Series:
             # with monit.section('Merge'):
             self.merge()
 
-    def _remove_nan(self, values) -> None:
+    def _append(self, step: List[float], value: np.ndarray) -> None:
+        """
+        Appends in place, growing the buffers geometrically when they are full.
+        Merging keeps the size under `max_buffer_length`,
+         so the buffers stop growing after a few updates.
+        """
+        size = self._size + len(value)
+        capacity = min(len(self._step), len(self._last_step), len(self._value))
+        if size > capacity:
+            capacity = max(size, 2 * capacity)
+            self._step = _grow(self._step, self._size, capacity)
+            self._last_step = _grow(self._last_step, self._size, capacity)
+            self._value = _grow(self._value, self._size, capacity)
+
+        self._step[self._size:size] = step
+        self._last_step[self._size:size] = step
+        self._value[self._size:size] = value
+        self._size = size
+
+    def _remove_nan_fast(self, values: np.ndarray) -> None:
+        labml_fast_merge.remove_nan(values, 0.0 if len(self.value) == 0 else self.value[-1])
+
+    def _remove_nan_old(self, values: np.ndarray) -> None:
         infin = np.isfinite(values)
         np.bitwise_not(infin, out=infin)
 
@@ -128,6 +213,20 @@ class Series:
             if infin[i]:
                 values[i] = values[i - 1]
 
+    def _merge_fast(self,
+                    values: np.ndarray,
+                    last_step: np.ndarray,
+                    steps: np.ndarray,
+                    prev_last_step: int = 0,
+                    i: int = 0  # from_step
+                    ):
+        return labml_fast_merge.merge(values,
+                                      last_step,
+                                      steps,
+                                      float(self.step_gap),
+                                      float(prev_last_step),
+                                      i)
+
     def _merge_old(self,
                    values: np.ndarray,
                    last_step: np.ndarray,
@@ -166,11 +265,13 @@ class Series:
 
         n = self._merge(self.value, self.last_step, self.step, prev_last_step, from_step)
 
-        self.last_step = self.last_step[:n]
-        self.step = self.step[:n]
-        self.value = self.value[:n]
+        self._size = n
 
     def get_extent(self, is_remove_outliers: bool):
+        """
+        The extent without outliers is kept in `extent` until the values change,
+         since `smooth_45` needs it for every span it tries
+        """
         if len(self.value) == 0:
             return [0, 0]
         elif len(self.value) < 10:
@@ -178,6 +279,15 @@ class Series:
         elif not is_remove_outliers:
             return [min(self.value), max(self.value)]
 
+        if self.extent is None:
+            self.extent = self._get_extent()
+
+        return self.extent
+
+    def _get_extent_fast(self):
+        return labml_fast_merge.get_extent(self.value, OUTLIER_MARGIN)
+
+    def _get_extent_old(self):
         values = np.sort(self.value)
         margin = max(int(len(values) * OUTLIER_MARGIN), 1)
         std_dev = np.std(self.value[margin:-margin])
@@ -194,6 +304,28 @@ class Series:
 
         return [values[start], values[end]]
 
+    def _get_extent_np(self):
+        """
+        Same as `_get_extent_old`, with the standard deviation taking the same steps as `np.std`
+         without its overhead, which was most of the time.
+        The margin scans usually stop at the first value.
+        """
+        n = len(self.value)
+        margin = max(int(n * OUTLIER_MARGIN), 1)
+        middle = self.value[margin:-margin]
+        deviation = middle - np.add.reduce(middle) / len(middle)
+        std_dev = np.sqrt(np.add.reduce(deviation * deviation) / len(middle))
+        values = np.sort(self.value)
+
+        start = 0
+        while start < margin and values[start] + std_dev * 2 <= values[margin]:
+            start += 1
+        end = n - 1
+        while end > n - margin - 1 and values[end] - std_dev * 2 >= values[n - margin]:
+            end -= 1
+
+        return [values[start], values[end]]
+
     def smooth_45(self) -> List[float]:
         forty_five = math.pi / 4
         hi = max(1, len(self.value) // MIN_SMOOTH_POINTS)
@@ -201,17 +333,68 @@ class Series:
 
         while lo < hi:
             m = (lo + hi) // 2
-            smoothed = self.smooth_value(m)
+            smoothed = self._smooth_value(m)
             angle = self.mean_angle(smoothed, 0.5)
             if angle > forty_five:
                 lo = m + 1
             else:
                 hi = m
 
-        return self.smooth_value(hi)
+        return self._smooth_value(hi).tolist()
 
-    def mean_angle(self, smoothed: List[float], aspect_ratio: float) -> Union[np.ndarray, float]:
-        x_range = max(self.last_step) - min(self.last_step)
+    def mean_angle(self, smoothed: Union[np.ndarray, List[float]], aspect_ratio: float) -> Union[np.ndarray, float]:
+        x_range = self.last_step.max() - self.last_step.min()
+        y_extent = self.get_extent(True)
+        y_range = y_extent[1] - y_extent[0]
+
+        if x_range < 1e-9 or y_range < 1e-9:
+            return 0
+
+        return self._mean_angle(np.asarray(smoothed, dtype=float), x_range, y_range, aspect_ratio)
+
+    def _mean_angle_fast(self, smoothed: np.ndarray, x_range: float, y_range: float, aspect_ratio: float) -> float:
+        return labml_fast_merge.mean_angle(self.last_step, smoothed, x_range, y_range, aspect_ratio)
+
+    def _mean_angle_np(self, smoothed: np.ndarray, x_range: float, y_range: float, aspect_ratio: float) -> float:
+        dx = np.diff(self.last_step[:len(smoothed)]) / x_range
+        dy = np.diff(smoothed) / y_range
+        angles = np.arctan2(np.abs(dy) * aspect_ratio, np.abs(dx))
+
+        return np.mean(angles)
+
+    def smooth_value(self, span: Optional[int] = None) -> List[float]:
+        if span is None:
+            span = len(self.value) // SMOOTH_POINTS
+
+        return self._smooth_value(span).tolist()
+
+    def _smooth_value_fast(self, span: int) -> np.ndarray:
+        return labml_fast_merge.smooth_value(self.value, span)
+
+    def _smooth_value_np(self, span: int) -> np.ndarray:
+        """
+        The running total of `_smooth_value_old` as a cumulative sum over its additions and subtractions,
+         in the same order, so that the results are identical.
+        Each step adds a value and then subtracts the one leaving the window, or zero.
+        """
+        span_extra = span // 2
+
+        n = len(self.value)
+        n_steps = n + span_extra
+        n_removed = max(0, n_steps - 2 * span_extra - 1)
+        updates = np.zeros((n_steps, 2))
+        updates[:n, 0] = self.value
+        updates[n_steps - n_removed:, 1] = -self.value[:n_removed]
+        totals = np.cumsum(updates.ravel())[1::2]
+
+        idx = np.arange(n_steps)
+        counts = np.minimum(idx + 1, n) - np.maximum(idx - 2 * span_extra, 0)
+
+        return (totals / counts)[span_extra:]
+
+    def _mean_angle_old(self, smoothed: List[float], aspect_ratio: float) -> Union[np.ndarray, float]:
+        last_step = self.last_step
+        x_range = max(last_step) - min(last_step)
         y_extent = self.get_extent(True)
         y_range = y_extent[1] - y_extent[0]
 
@@ -220,41 +403,85 @@ class Series:
 
         angles = []
         for i in range(len(smoothed) - 1):
-            dx = (self.last_step[i + 1] - self.last_step[i]) / x_range
+            dx = (last_step[i + 1] - last_step[i]) / x_range
             dy = (smoothed[i + 1] - smoothed[i]) / y_range
             angles.append(math.atan2(abs(dy) * aspect_ratio, abs(dx)))
 
         return np.mean(angles)
 
-    def smooth_value(self, span: Optional[int] = None) -> List[float]:
+    def _smooth_value_old(self, span: Optional[int] = None) -> List[float]:
         if span is None:
             span = len(self.value) // SMOOTH_POINTS
         span_extra = span // 2
+        values = self.value
 
         n = 0
         total = 0
         smoothed = []
-        for i in range(len(self.value) + span_extra):
+        for i in range(len(values) + span_extra):
             j = i - span_extra
-            if i < len(self.value):
-                total += self.value[i]
+            if i < len(values):
+                total += values[i]
                 n += 1
             if j - span_extra - 1 >= 0:
-                total -= self.value[j - span_extra - 1]
+                total -= values[j - span_extra - 1]
                 n -= 1
             if j >= 0:
                 smoothed.append(total / n)
 
         return smoothed
 
-    def load(self, data):
-        self.step = data['step'].copy()
-        self.last_step = data['last_step'].copy()
-        self.value = data['value'].copy()
+    def load(self, data, copy: bool = True):
+        """
+        Arrays of `data` are copied, since it may be shared with other series or cached responses.
+        With `copy=False` the series takes ownership of `data` and updates its buffers in place.
+        """
+        if copy:
+            self._step = data['step'].copy()
+            self._last_step = data['last_step'].copy()
+            self._value = data['value'].copy()
+        else:
+            self._step = _get_buffer(data['step'])
+            self._last_step = _get_buffer(data['last_step'])
+            self._value = _get_buffer(data['value'])
+        self._size = len(data['last_step'])
 
         if 'smoothed' in data:
             self.smoothed = data['smoothed'].copy()
         else:
             self.smoothed = []
 
+        self.extent = data.get('extent', None)
+
+        # series saved before pyramids only have them for new points
+        if self.pyramid is not None:
+            if data.get('pyramid', None):
+                self.pyramid = deepcopy(data['pyramid']) if copy else data['pyramid']
+            else:
+                self.pyramid = pyramid.create(self._size > 0)
+
         return self
+
+    def select_range(self, start: Optional[float], end: Optional[float],
+                     points: int) -> Tuple[np.ndarray, np.ndarray, float]:
+        """
+        Steps and values in `[start, end]` from the finest resolution that has the whole range,
+         and the step gap of that resolution.
+        Falls back to the merged series when the range starts before the pyramid levels.
+        """
+        level = pyramid.select_level(self.pyramid, start, end, points)
+        if level is None:
+            step, value = pyramid.get_range(self.last_step, self.value, start, end, points)
+            return step, value, self.step_gap
+        else:
+            step, value = pyramid.get_range(level['step'], level['value'], start, end, points)
+            return step, value, level['gap']
+
+    def get_range(self, start: Optional[float], end: Optional[float], points: int) -> Dict[str, List[float]]:
+        step, value, gap = self.select_range(start, end, points)
+
+        return {
+            'step': step.tolist(),
+            'value': value.tolist(),
+            'step_gap': gap,
+        }
@@ -1,58 +1,255 @@
-from typing import Dict, Any, List
+import math
+from typing import Dict, Any, List, Optional, Set, Callable
 
+import numpy as np
+from labml_db import Model, Key
+from labml_db.serializer.pickle import PickleSerializer
+
+from .analysis import Analysis
+from .cache import response_cache
 from ..analyses.series import SeriesModel, Series
 
 
+STATISTICS = ['mean', 'last', 'min', 'max', 'l1', 'l2']
+
+
+def _get_statistics(summary: Dict[str, float]) -> Dict[str, float]:
+    """
+    `l1` is the mean absolute value and `l2` is the root mean square
+    """
+    n = summary['count']
+
+    return {
+        'mean': summary['sum'] / n,
+        'last': summary['last'],
+        'min': summary['min'],
+        'max': summary['max'],
+        'l1': summary['abs_sum'] / n,
+        'l2': math.sqrt(summary['square_sum'] / n),
+    }
+
+
+@Analysis.db_model(PickleSerializer, 'series')
+class SeriesDataModel(Model['SeriesDataModel']):
+    data: SeriesModel
+
+
 class SeriesCollection:
+    """
+    Each series is stored in its own `SeriesDataModel` record, and `series_keys` maps indicators to them.
+    Series are loaded on first access and only the updated ones are written back.
+    `tracking` holds series of collections saved before this layout;
+     they are moved to their own records when updated or by `scripts.migrate_series`.
+    `version` is incremented whenever new data is tracked, and tags cached responses.
+    `summaries` has running sums of the tracked values of each series,
+     so that statistics don't need the series to be loaded.
+    Series of collections with `has_pyramid` keep pyramids for range queries.
+    """
     tracking: Dict[str, SeriesModel]
+    series_keys: Dict[str, Key['SeriesDataModel']]
+    summaries: Dict[str, Dict[str, float]]
     indicators: set
     step: int
+    version: int
     max_buffer_length: int
 
+    has_pyramid = False
+
     @classmethod
     def defaults(cls):
         return dict(tracking={},
+                    series_keys={},
+                    summaries={},
                     step=0,
+                    version=0,
                     indicators=set(),
                     max_buffer_length=None,
                     )
 
+    @property
+    def _loaded_series(self) -> Dict[str, SeriesModel]:
+        if '_series_cache' not in self.__dict__:
+            self._series_cache = {}
+
+        return self._series_cache
+
+    @property
+    def _dirty_series(self) -> Set[str]:
+        if '_series_dirty' not in self.__dict__:
+            self._series_dirty = set()
+
+        return self._series_dirty
+
+    def get_series_names(self) -> List[str]:
+        return [*self.series_keys.keys(), *self.tracking.keys()]
+
+    def get_series(self, ind: str) -> Optional[SeriesModel]:
+        if ind in self._loaded_series:
+            return self._loaded_series[ind]
+        if ind in self.tracking:
+            return self.tracking[ind]
+        if ind not in self.series_keys:
+            return None
+
+        self._loaded_series[ind] = self.series_keys[ind].load().data
+
+        return self._loaded_series[ind]
+
+    def get_all_series(self) -> Dict[str, SeriesModel]:
+        inds = [ind for ind in self.series_keys if ind not in self._loaded_series]
+        if inds:
+            models = SeriesDataModel.mload([str(self.series_keys[ind]) for ind in inds])
+            for ind, m in zip(inds, models):
+                if m is not None:
+                    self._loaded_series[ind] = m.data
+
+        res = dict(self.tracking)
+        for ind in self.series_keys:
+            if ind in self._loaded_series:
+                res[ind] = self._loaded_series[ind]
+
+        return res
+
+    def set_series(self, ind: str, data: SeriesModel) -> None:
+        self._loaded_series[ind] = data
+        self._dirty_series.add(ind)
+
+    def _save_dirty_series(self) -> bool:
+        """
+        Returns whether new series records were created, so that `series_keys` needs saving
+        """
+        if not self._dirty_series:
+            return False
+
+        is_new = False
+        models = []
+        for ind in self._dirty_series:
+            if ind in self.series_keys:
+                key = str(self.series_keys[ind])
+            else:
+                key = None
+                is_new = True
+                self.tracking.pop(ind, None)
+
+            m = SeriesDataModel(key, data=self._loaded_series[ind])
+            self.series_keys[ind] = m.key
+            models.append(m)
+
+        SeriesDataModel.msave(models)
+        self._dirty_series.clear()
+
+        return is_new
+
+    def save_series(self) -> None:
+        if self._save_dirty_series():
+            self.save()
+
+    def remove_series(self, inds: List[str]) -> None:
+        """
+        Removes some series. The collection needs to be saved afterwards.
+        """
+        for ind in inds:
+            key = self.series_keys.pop(ind, None)
+            if key is not None:
+                key.delete()
+            self.tracking.pop(ind, None)
+            self.summaries.pop(ind, None)
+            self._loaded_series.pop(ind, None)
+            self._dirty_series.discard(ind)
+
+    def delete_series(self) -> None:
+        for ind, key in self.series_keys.items():
+            key.delete()
+
+        self.series_keys = {}
+        self.summaries = {}
+        self._loaded_series.clear()
+        self._dirty_series.clear()
+
+        response_cache.invalidate(str(self.key))
+
+    def get_cached(self, name: str, compute: Callable[[], Any]) -> Any:
+        return response_cache.get(str(self.key), name, self.version, compute)
+
     def get_tracks(self) -> List[SeriesModel]:
+        """
+        Smoothed values computed here are not saved, since this doesn't hold the lock that `track` runs under.
+        Responses are cached instead.
+        """
         res = []
-        is_series_updated = False
-        for ind, track in self.tracking.items():
+        for ind, track in self.get_all_series().items():
             name = ind.split('.')
 
             s = Series().load(track)
             series: Dict[str, Any] = s.detail
             series['name'] = '.'.join(name[1:])
 
-            if s.is_smoothed_updated:
-                self.tracking[ind] = s.to_data()
-                is_series_updated = True
-
             res.append(series)
 
-        if is_series_updated:
-            self.save()
-
         return res
 
     def track(self, data: Dict[str, SeriesModel]) -> None:
+        self._summarize_legacy_series()
         for ind, series in data.items():
             self.step = max(self.step, series['step'][-1])
             self._update_series(ind, series)
 
+        self.version += 1
+        self._save_dirty_series()
         self.save()
 
+        response_cache.invalidate(str(self.key))
+
     def _update_series(self, ind: str, series: SeriesModel) -> None:
-        if ind not in self.tracking:
-            self.tracking[ind] = Series(self.max_buffer_length).to_data()
+        track = self.get_series(ind)
+        if track is None:
+            track = Series(self.max_buffer_length).to_data()
 
-        s = Series(self.max_buffer_length).load(self.tracking[ind])
+        # the old data is replaced by the update, so the series can append to its buffers
+        s = Series(self.max_buffer_length, self.has_pyramid).load(track, copy=False)
         s.update(series['step'], series['value'])
 
-        self.tracking[ind] = s.to_data()
+        self.set_series(ind, s.to_data())
+        self._update_summary(ind, series['value'])
+
+    def _update_summary(self, ind: str, value: List[float]) -> None:
+        if ind not in self.summaries:
+            self.summaries[ind] = {'count': 0, 'sum': 0., 'abs_sum': 0., 'square_sum': 0.,
+                                   'min': math.inf, 'max': -math.inf, 'last': 0.}
+        summary = self.summaries[ind]
+
+        value = np.asarray(value, dtype=float)
+        value = value[np.isfinite(value)]
+        if len(value) == 0:
+            return
+
+        summary['count'] += len(value)
+        summary['sum'] += value.sum().item()
+        summary['abs_sum'] += np.abs(value).sum().item()
+        summary['square_sum'] += np.square(value).sum().item()
+        summary['min'] = min(summary['min'], value.min().item())
+        summary['max'] = max(summary['max'], value.max().item())
+        summary['last'] = value[-1].item()
+
+    def _summarize_legacy_series(self) -> None:
+        """
+        Series tracked before summaries were kept get them from their merged values.
+        These are saved by `track`, which runs under the lock.
+        """
+        if all(ind in self.summaries for ind in self.get_series_names()):
+            return
+
+        for ind, track in self.get_all_series().items():
+            if ind not in self.summaries:
+                self._update_summary(ind, track['value'])
+
+    def get_summaries(self) -> Dict[str, Dict[str, float]]:
+        """
+        Statistics of each series, named in `STATISTICS`
+        """
+        self._summarize_legacy_series()
+
+        return {ind: _get_statistics(summary) for ind, summary in self.summaries.items() if summary['count'] > 0}
 
     def save(self):
         raise NotImplementedError
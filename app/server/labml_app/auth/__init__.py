@@ -9,6 +9,7 @@ from ..db import app_token
 from ..db import project
 from ..db import user
 from .. import settings
+from ..utils import executors
 
 
 def get_app_token(request: Request) -> 'app_token.AppToken':
@@ -37,12 +38,12 @@ def login_required(func) -> functools.wraps:
     @functools.wraps(func)
     async def wrapper(request: Request, *args, **kwargs):
         token_id = request.headers.get('Authorization', '')
-        at = app_token.get_or_create(token_id)
+        at = await executors.run_db(app_token.get_or_create, token_id)
         if at.is_auth or not settings.IS_LOGIN_REQUIRED:
             if inspect.iscoroutinefunction(func):
                 return await func(request, *args, **kwargs)
             else:
-                return func(request, *args, **kwargs)
+                return await executors.run_db(func, request, *args, **kwargs)
         else:
             response = JSONResponse()
             response.status_code = 403
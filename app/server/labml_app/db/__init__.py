@@ -3,7 +3,6 @@ from pathlib import Path
 
 from labml_db import Model, Index
 from labml_db.driver.redis import RedisDbDriver
-from labml_db.driver.file import FileDbDriver
 from labml_db.index_driver.redis import RedisIndexDbDriver
 from labml_db.index_driver.file import FileIndexDbDriver
 from labml_db.serializer.json import JsonSerializer
@@ -11,16 +10,23 @@ from labml_db.serializer.yaml import YamlSerializer
 from labml_db.serializer.pickle import PickleSerializer
 
 from .. import settings
+from .file_driver import AtomicFileDbDriver
 from . import project
 from . import user
 from . import status
 from . import app_token
 from . import run
+from . import run_output
+from . import details
+from . import run_summary
 from . import session
 from . import computer
 from . import job
+from . import job_hub
+from . import locks
 from . import blocked_uuids
 from .. import analyses
+from ..analyses.series_collection import SeriesCollection, SeriesDataModel
 
 Models = [(YamlSerializer(), user.User),
           (YamlSerializer(), project.Project),
@@ -28,10 +34,19 @@ Models = [(YamlSerializer(), user.User),
           (JsonSerializer(), status.RunStatus),
           (JsonSerializer(), app_token.AppToken),
           (JsonSerializer(), run.Run),
+          (JsonSerializer(), details.RunDetails),
+          (JsonSerializer(), details.SessionDetails),
+          (JsonSerializer(), run_summary.RunSummary),
+          (JsonSerializer(), run_output.RunOutput),
+          (JsonSerializer(), run_output.OutputChunk),
           (JsonSerializer(), session.Session),
           (PickleSerializer(), job.Job),
           (PickleSerializer(), computer.Computer)] + [(s(), m) for s, m, p in analyses.AnalysisManager.get_db_models()]
 
+# series of analyses, which are written on every push, can be kept in a separate Redis database
+SeriesModels = {m for s, m, p in analyses.AnalysisManager.get_db_models()
+                if issubclass(m, (SeriesCollection, SeriesDataModel))}
+
 Indexes = [project.ProjectIndex,
            user.UserIndex,
            blocked_uuids.BlockedRunIndex,
@@ -39,6 +54,7 @@ Indexes = [project.ProjectIndex,
            user.TokenOwnerIndex,
            app_token.AppTokenIndex,
            run.RunIndex,
+           run_summary.RunSummaryIndex,
            session.SessionIndex,
            job.JobIndex,
            computer.ComputerIndex] + [m for s, m, p in analyses.AnalysisManager.get_db_indexes()]
@@ -54,20 +70,47 @@ def get_data_path():
     return data_path
 
 
+def _create_redis(db: int):
+    """
+    Each Redis database gets its own pool.
+    The pool blocks for up to `REDIS_POOL_TIMEOUT` seconds when all connections are in use.
+    """
+    import redis
+
+    pool = redis.BlockingConnectionPool(host=settings.REDIS_HOST,
+                                        port=settings.REDIS_PORT,
+                                        db=db,
+                                        max_connections=settings.REDIS_MAX_CONNECTIONS,
+                                        timeout=settings.REDIS_POOL_TIMEOUT,
+                                        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                                        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                                        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL)
+
+    return redis.Redis(connection_pool=pool)
+
+
 def init_db():
     data_path = get_data_path()
 
     if settings.IS_LOCAL_SETUP:
         Model.set_db_drivers(
-            [FileDbDriver(PickleSerializer(), m, Path(f'{data_path}/{m.__name__}')) for s, m in Models])
+            [AtomicFileDbDriver(PickleSerializer(), m, Path(f'{data_path}/{m.__name__}')) for s, m in Models])
         Index.set_db_drivers(
             [FileIndexDbDriver(YamlSerializer(), m, Path(f'{data_path}/{m.__name__}.yaml')) for m in Indexes])
+
+        locks.set_path(Path(f'{data_path}/locks'))
     else:
-        import redis
-        db = redis.Redis(host='localhost', port=6379, db=0)
+        db = _create_redis(settings.REDIS_DB)
+        if settings.REDIS_SERIES_DB == settings.REDIS_DB:
+            series_db = db
+        else:
+            series_db = _create_redis(settings.REDIS_SERIES_DB)
 
-        Model.set_db_drivers([RedisDbDriver(s, m, db) for s, m in Models])
+        Model.set_db_drivers([RedisDbDriver(s, m, series_db if m in SeriesModels else db) for s, m in Models])
         Index.set_db_drivers([RedisIndexDbDriver(m, db) for m in Indexes])
 
+        job_hub.get_hub().set_redis(db)
+        locks.set_redis(db)
+
     project.create_project(settings.FLOAT_PROJECT_TOKEN, 'float project')
     project.create_project(settings.SAMPLES_PROJECT_TOKEN, 'samples project')
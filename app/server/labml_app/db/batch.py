@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict
+
+from labml_db import Model, Key
+
+from .. import settings
+
+FILE_READ_THREADS = 8
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(FILE_READ_THREADS, thread_name_prefix='labml_db_read')
+
+    return _executor
+
+
+def load_keys(keys: List[Key]) -> List[Optional[Model]]:
+    """
+    Loads models of a list of keys, in order, with `None` for missing models.
+    With Redis, models of the same type are fetched with a single `MGET`.
+    With the file driver, files are read in parallel.
+    """
+    if not keys:
+        return []
+
+    if settings.IS_LOCAL_SETUP:
+        return list(_get_executor().map(lambda k: k.load(), keys))
+
+    by_model: Dict[str, List[int]] = {}
+    for i, k in enumerate(keys):
+        model_name = str(k).split(':')[0]
+        if model_name not in by_model:
+            by_model[model_name] = []
+        by_model[model_name].append(i)
+
+    res: List[Optional[Model]] = [None] * len(keys)
+    for model_name, idx in by_model.items():
+        models = Model.mload([str(keys[i]) for i in idx])
+        for i, m in zip(idx, models):
+            res[i] = m
+
+    return res
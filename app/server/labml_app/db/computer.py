@@ -3,7 +3,9 @@ from typing import List, Dict, Set, Optional, Any
 
 from labml_db import Model, Index, Key
 
+from . import batch
 from . import job
+from . import job_hub
 from . import run
 
 JobResponse = Dict[str, str]
@@ -65,6 +67,8 @@ class Computer(Model['Computer']):
         self.pending_jobs[j.job_uuid] = j.key
         self.save()
 
+        job_hub.get_hub().notify(self.computer_uuid)
+
         return j
 
     def get_completed_job(self, job_uuid: str) -> Optional['job.Job']:
@@ -78,12 +82,9 @@ class Computer(Model['Computer']):
         return None
 
     def get_pending_jobs(self) -> List['job.JobDict']:
-        res = []
-        for k, v in self.pending_jobs.items():
-            j = v.load()
-            res.append(j.to_data())
+        jobs = batch.load_keys(list(self.pending_jobs.values()))
 
-        return res
+        return [j.to_data() for j in jobs if j]
 
     def sync_runs(self, runs: List[Dict[str, Any]]) -> Dict[str, List[str]]:
         active = []
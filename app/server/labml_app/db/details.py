@@ -0,0 +1,35 @@
+from typing import Dict, List, Union
+
+from labml_db import Model
+
+
+class RunDetails(Model['RunDetails']):
+    """
+    Bulky fields of a run, kept apart so that status checks and syncs of a run don't load them
+    """
+    configs: Dict[str, any]
+    wildcard_indicators: Dict[str, Dict[str, Union[str, bool]]]
+    indicators: Dict[str, Dict[str, Union[str, bool]]]
+    errors: List[Dict[str, str]]
+
+    @classmethod
+    def defaults(cls):
+        return dict(configs={},
+                    wildcard_indicators={},
+                    indicators={},
+                    errors=[],
+                    )
+
+
+class SessionDetails(Model['SessionDetails']):
+    """
+    Bulky fields of a session, kept apart so that status checks of a session don't load them
+    """
+    configs: Dict[str, any]
+    errors: List[Dict[str, str]]
+
+    @classmethod
+    def defaults(cls):
+        return dict(configs={},
+                    errors=[],
+                    )
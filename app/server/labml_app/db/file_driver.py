@@ -0,0 +1,24 @@
+import os
+import tempfile
+
+from labml_db.driver.file import FileDbDriver
+from labml_db.types import ModelDict
+
+
+class AtomicFileDbDriver(FileDbDriver):
+    """
+    Writes each model to a temporary file and renames it over the old one.
+    `FileDbDriver` truncates the file before locking it, and its locks don't exclude threads of a process,
+     so other threads could read a partly written model.
+    """
+
+    def save_dict(self, key: str, data: ModelDict):
+        path = self._db_path / f'{key}.{self._serializer.file_extension}'
+        fd, tmp_path = tempfile.mkstemp(dir=str(self._db_path), prefix=f'.{key}.', suffix='.tmp')
+        try:
+            with open(fd, 'wb' if self._serializer.is_bytes else 'w') as f:
+                f.write(self._serializer.to_string(data))
+            os.replace(tmp_path, str(path))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from typing import Dict, Set, Optional
+
+CHANNEL_PREFIX = 'labml_jobs:'
+
+
+class JobWaiter:
+    def __init__(self, computer_uuid: str):
+        self.computer_uuid = computer_uuid
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def notify(self) -> None:
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+        return True
+
+
+class JobHub:
+    """
+    Wakes up polling requests of a computer when a job is created for it.
+    Waiters are kept in-process. With Redis, notifications are published so that
+     waiters in other worker processes are woken up too.
+    """
+    _waiters: Dict[str, Set[JobWaiter]]
+
+    def __init__(self):
+        self._waiters = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self._listener = None
+
+    def set_redis(self, db) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+
+        self._db = db
+        pubsub = db.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(**{f'{CHANNEL_PREFIX}*': self._on_message})
+        self._listener = pubsub.run_in_thread(sleep_time=1., daemon=True)
+
+    def _on_message(self, message: Dict[str, any]) -> None:
+        channel = message['channel']
+        if isinstance(channel, bytes):
+            channel = channel.decode('utf-8')
+
+        self._notify_local(channel[len(CHANNEL_PREFIX):])
+
+    def _notify_local(self, computer_uuid: str) -> None:
+        with self._lock:
+            waiters = list(self._waiters.get(computer_uuid, []))
+
+        for w in waiters:
+            w.notify()
+
+    def subscribe(self, computer_uuid: str) -> JobWaiter:
+        """
+        Subscribe before checking for pending jobs, so that a job created in between is not missed
+        """
+        w = JobWaiter(computer_uuid)
+        with self._lock:
+            if computer_uuid not in self._waiters:
+                self._waiters[computer_uuid] = set()
+            self._waiters[computer_uuid].add(w)
+
+        return w
+
+    def unsubscribe(self, w: JobWaiter) -> None:
+        with self._lock:
+            waiters = self._waiters.get(w.computer_uuid, set())
+            waiters.discard(w)
+            if not waiters:
+                self._waiters.pop(w.computer_uuid, None)
+
+    def notify(self, computer_uuid: str) -> None:
+        if self._db is not None:
+            self._db.publish(f'{CHANNEL_PREFIX}{computer_uuid}', '')
+        else:
+            self._notify_local(computer_uuid)
+
+
+_hub: Optional[JobHub] = None
+
+
+def get_hub() -> JobHub:
+    global _hub
+
+    if _hub is None:
+        _hub = JobHub()
+
+    return _hub
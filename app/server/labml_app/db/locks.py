@@ -0,0 +1,88 @@
+import fcntl
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from ..logger import logger
+
+LOCK_PREFIX = 'labml_lock:'
+LOCK_TIMEOUT = 60
+LOCK_BLOCKING_TIMEOUT = 30
+LOCK_POLL_INTERVAL = 0.05
+
+_db = None
+_path: Optional[Path] = None
+
+
+class LockTimeoutError(Exception):
+    """
+    Raised when a lock is not acquired within `LOCK_BLOCKING_TIMEOUT` seconds
+    """
+    pass
+
+
+def set_redis(db) -> None:
+    global _db
+
+    _db = db
+
+
+def set_path(path: Path) -> None:
+    global _path
+
+    path.mkdir(parents=True, exist_ok=True)
+    _path = path
+
+
+@contextmanager
+def _redis_lock(name: str):
+    from redis.exceptions import LockNotOwnedError
+
+    lock = _db.lock(f'{LOCK_PREFIX}{name}', timeout=LOCK_TIMEOUT, blocking_timeout=LOCK_BLOCKING_TIMEOUT)
+    if not lock.acquire():
+        raise LockTimeoutError(name)
+
+    try:
+        yield
+    finally:
+        try:
+            lock.release()
+        except LockNotOwnedError:
+            logger.error(f'lock {name} expired before it was released')
+
+
+@contextmanager
+def _file_lock(name: str):
+    with open(str(_path / f'{name}.lock'), 'a') as f:
+        deadline = time.time() + LOCK_BLOCKING_TIMEOUT
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.time() > deadline:
+                    raise LockTimeoutError(name)
+                time.sleep(LOCK_POLL_INTERVAL)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def lock(name: str):
+    """
+    Lock shared by all worker processes.
+    Raises `LockTimeoutError` if the lock is held for more than `LOCK_BLOCKING_TIMEOUT` seconds,
+     so that a stuck holder doesn't block callers indefinitely.
+    With Redis, locks expire after `LOCK_TIMEOUT` seconds so that a crashed worker doesn't hold them.
+    Otherwise, it's a file lock in the data folder.
+    """
+    if _db is not None:
+        with _redis_lock(name):
+            yield
+    else:
+        with _file_lock(name):
+            yield
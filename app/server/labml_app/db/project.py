@@ -1,10 +1,14 @@
-from typing import List, Dict, Union, Optional
+import bisect
+from typing import List, Dict, Union, Optional, Tuple
 
 from labml_db import Model, Key, Index
 
+from . import batch
 from . import run
+from . import run_summary
 from . import session
 from . import blocked_uuids
+from . import locks
 from ..logger import logger
 
 
@@ -13,6 +17,7 @@ class Project(Model['Project']):
     is_sharable: float
     name: str
     runs: Dict[str, Key['run.Run']]
+    runs_by_start_time: List[List[Union[float, str]]]
     sessions: Dict[str, Key['session.Session']]
     is_run_added: bool
 
@@ -22,6 +27,7 @@ class Project(Model['Project']):
                     is_sharable=False,
                     labml_token='',
                     runs={},
+                    runs_by_start_time=[],
                     sessions={},
                     is_run_added=False,
                     )
@@ -32,36 +38,79 @@ class Project(Model['Project']):
     def is_project_session(self, session_uuid: str) -> bool:
         return session_uuid in self.sessions
 
-    def get_runs(self) -> List['run.Run']:
-        res = []
-        likely_deleted = []
-        for run_uuid, run_key in self.runs.items():
-            try:
-                r = run.get(run_uuid)
-                if r:
-                    res.append(r)
-                else:
-                    likely_deleted.append(run_uuid)
-            except TypeError as e:
-                logger.error('error in creating run list, ' + run_uuid + ':' + str(e))
+    def insert_run(self, r: Union['run.Run', 'run_summary.RunSummary']) -> None:
+        """
+        Adds a run and keeps `runs_by_start_time` in order. The project needs to be saved afterwards.
+        """
+        self.runs_by_start_time = [e for e in self.runs_by_start_time if e[1] != r.run_uuid]
+        bisect.insort(self.runs_by_start_time, [r.start_time or 0., r.run_uuid])
+        if isinstance(r, run.Run):
+            self.runs[r.run_uuid] = r.key
+
+    def sync_runs_by_start_time(self) -> bool:
+        """
+        `runs_by_start_time` holds `[start_time, run_uuid]` of the project runs in ascending order.
+        This adds runs that were added without it, creating their summaries, and drops removed runs.
+        It's for `scripts.migrate_run_summaries`; the project needs to be saved afterwards.
+        Returns whether the project was changed.
+        """
+        listed = {run_uuid for _, run_uuid in self.runs_by_start_time}
+        if listed == set(self.runs.keys()):
+            return False
+
+        self.runs_by_start_time = [r for r in self.runs_by_start_time if r[1] in self.runs]
+
+        missing = {run_uuid: run_key for run_uuid, run_key in self.runs.items() if run_uuid not in listed}
+        runs = batch.load_keys(list(missing.values()))
+        for run_uuid, r in zip(missing, runs):
+            if r:
+                self.insert_run(run_summary.create(r, r.status.load()))
+            else:
+                self.runs.pop(run_uuid)
 
-        for run_uuid in likely_deleted:
-            self.runs.pop(run_uuid)
+        return True
 
-        if self.is_run_added:
-            self.is_run_added = False
+    def _get_runs_by_start_time(self) -> List[List[Union[float, str]]]:
+        """
+        Runs of projects that are not migrated yet are ordered in memory, with summaries built from the runs
+        """
+        listed = {run_uuid for _, run_uuid in self.runs_by_start_time}
+        res = [r for r in self.runs_by_start_time if r[1] in self.runs]
 
-        if not self.is_run_added or likely_deleted:
-            self.save()
+        missing = {run_uuid: run_key for run_uuid, run_key in self.runs.items() if run_uuid not in listed}
+        if missing:
+            summaries = run_summary.get_summaries(missing)
+            res += [[s.start_time or 0., run_uuid] for run_uuid, s in summaries.items()]
+            res.sort()
 
         return res
 
-    def get_sessions(self) -> List['session.Session']:
-        res = []
-        for session_uuid, session_key in self.sessions.items():
-            res.append(session_key.load())
+    def get_run_summaries(self, start: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, any]], int]:
+        """
+        Summaries of runs, latest first, and the number of runs that have summaries.
+        Summaries of runs outside the page are counted from the index, without loading them.
+        """
+        latest_first = self._get_runs_by_start_time()[::-1]
+        if limit:
+            page = latest_first[start:start + limit]
+        else:
+            page = latest_first[start:]
+
+        run_uuids = [run_uuid for _, run_uuid in page]
+        summaries = run_summary.get_summaries({run_uuid: self.runs[run_uuid] for run_uuid in run_uuids})
+        res = [summaries[run_uuid].get_data() for run_uuid in run_uuids if run_uuid in summaries]
+
+        # summaries of runs that are not in `runs_by_start_time` were built from the runs
+        on_page = set(run_uuids)
+        listed = {run_uuid for _, run_uuid in self.runs_by_start_time}
+        others = [run_uuid for _, run_uuid in latest_first if run_uuid not in on_page]
+        others_listed = [run_uuid for run_uuid in others if run_uuid in listed]
+        n_others = len(others) - len(others_listed) + run_summary.count_summaries(others_listed)
+
+        return res, len(res) + n_others
 
-        return res
+    def get_sessions(self) -> List['session.Session']:
+        return batch.load_keys(list(self.sessions.values()))
 
     def delete_runs(self, run_uuids: List[str], project_owner: str) -> None:
         for run_uuid in run_uuids:
@@ -76,6 +125,8 @@ class Project(Model['Project']):
                     except TypeError:
                         logger.error(f'error while deleting the run {run_uuid}')
 
+        self.runs_by_start_time = [r for r in self.runs_by_start_time if r[1] in self.runs]
+
         self.save()
 
     def delete_sessions(self, session_uuids: List[str], project_owner: str) -> None:
@@ -97,7 +148,7 @@ class Project(Model['Project']):
         r = run.get(run_uuid)
 
         if r:
-            self.runs[run_uuid] = r.key
+            self.insert_run(r)
 
         self.save()
 
@@ -141,6 +192,18 @@ def get_session(session_uuid: str, labml_token: str = '') -> Optional['session.S
         return None
 
 
+def clear_run_added(labml_token: str) -> None:
+    """
+    Marks added runs as seen.
+    The project is reloaded under the lock that run creation takes, so that runs added meanwhile are kept.
+    """
+    with locks.lock(f'project_{labml_token}'):
+        p = get_project(labml_token)
+        if p.is_run_added:
+            p.is_run_added = False
+            p.save()
+
+
 def create_project(labml_token: str, name: str) -> None:
     project_key = ProjectIndex.get(labml_token)
 
@@ -1,5 +1,5 @@
 import time
-from typing import Dict, List, Optional, Union, NamedTuple
+from typing import Dict, List, Optional, Union, NamedTuple, Any
 
 from fastapi import Request
 
@@ -10,7 +10,11 @@ from . import user
 from .. import utils
 from . import project
 from . import computer
+from . import run_output
+from . import run_summary
 from . import status
+from . import details
+from . import locks
 from .. import settings
 from ..logger import logger
 from .. import analyses
@@ -54,6 +58,8 @@ class Run(Model['Run']):
     logger_unmerged: str
     stderr: str
     stderr_unmerged: str
+    outputs: Dict[str, Key['run_output.RunOutput']]
+    details: Key['details.RunDetails']
 
     wildcard_indicators: Dict[str, Dict[str, Union[str, bool]]]
     indicators: Dict[str, Dict[str, Union[str, bool]]]
@@ -88,6 +94,8 @@ class Run(Model['Run']):
                     logger_unmerged='',
                     stderr='',
                     stderr_unmerged='',
+                    outputs={},
+                    details=None,
                     wildcard_indicators={},
                     indicators={},
                     errors=[]
@@ -99,9 +107,7 @@ class Run(Model['Run']):
 
     @property
     def is_in_progress(self) -> bool:
-        s = get_status(self.run_uuid)
-
-        return s.get_true_status() == RunEnums.RUN_IN_PROGRESS
+        return status.get_cached_true_status(self.status) == RunEnums.RUN_IN_PROGRESS
 
     @property
     def is_sync_needed(self) -> bool:
@@ -126,7 +132,11 @@ class Run(Model['Run']):
 
         self.save()
 
+        run_summary.update_run(self)
+
     def update_run(self, data: Dict[str, any]) -> None:
+        summary = self.get_summary()
+
         if not self.name:
             self.name = data.get('name', '')
         if not self.comment:
@@ -147,9 +157,12 @@ class Run(Model['Run']):
             self.computer_uuid = data.get('computer', '')
             computer.add_run(self.computer_uuid, self.run_uuid)
 
+        self.move_details()
+        is_details_updated = False
         if 'configs' in data:
             configs = data.get('configs', {})
-            self.configs.update(configs)
+            self.get_details().configs.update(configs)
+            is_details_updated = True
 
             defaults = {}
             for k, v in configs.items():
@@ -162,23 +175,117 @@ class Run(Model['Run']):
                 analyses.AnalysisManager.get_experiment_analysis('HyperParamsAnalysis',
                                                                  self.run_uuid).set_default_values(defaults)
 
-        if 'stdout' in data and data['stdout']:
-            stdout_processed, self.stdout_unmerged = self.merge_output(self.stdout_unmerged, data['stdout'])
-            self.stdout += stdout_processed
-        if 'logger' in data and data['logger']:
-            logger_processed, self.logger_unmerged = self.merge_output(self.logger_unmerged, data['logger'])
-            self.logger += logger_processed
-        if 'stderr' in data and data['stderr']:
-            stderr_processed, self.stderr_unmerged = self.merge_output(self.stderr_unmerged, data['stderr'])
-            self.stderr += stderr_processed
-
-        if not self.indicators:
-            self.indicators = data.get('indicators', {})
-        if not self.wildcard_indicators:
-            self.wildcard_indicators = data.get('wildcard_indicators', {})
+        for output_type in run_output.OUTPUT_TYPES:
+            if output_type in data and data[output_type]:
+                o = self.get_output(output_type)
+                processed, o.unmerged = self.merge_output(o.unmerged, data[output_type])
+                o.append(processed)
+
+        if data.get('indicators', {}) and not self.get_details().indicators:
+            self.get_details().indicators = data['indicators']
+            is_details_updated = True
+        if data.get('wildcard_indicators', {}) and not self.get_details().wildcard_indicators:
+            self.get_details().wildcard_indicators = data['wildcard_indicators']
+            is_details_updated = True
+
+        if is_details_updated:
+            self.get_details().save()
 
         self.save()
 
+        if self.get_summary() != summary:
+            run_summary.update_run(self)
+
+    def get_details(self) -> 'details.RunDetails':
+        """
+        Details are loaded on first access.
+        Runs saved before details were stored separately have them built from the fields of the run,
+         without saving. `update_run` and `scripts/migrate_details.py` move them to `RunDetails`.
+        """
+        if '_details' in self.__dict__:
+            return self._details
+
+        if self.details is not None:
+            self._details = self.details.load()
+        else:
+            self._details = details.RunDetails(configs=self.configs,
+                                               indicators=self.indicators,
+                                               wildcard_indicators=self.wildcard_indicators,
+                                               errors=self.errors)
+
+        return self._details
+
+    def move_details(self) -> bool:
+        """
+        Saves details of a run saved before they were stored separately to `RunDetails`.
+        The caller saves the run.
+        """
+        if self.details is not None:
+            return False
+
+        d = self.get_details()
+        d.save()
+
+        self.configs = {}
+        self.indicators = {}
+        self.wildcard_indicators = {}
+        self.errors = []
+        self.details = d.key
+
+        return True
+
+    def get_output(self, output_type: str) -> 'run_output.RunOutput':
+        """
+        Output written before chunked storage is moved to it when the run pushes more output.
+        This is only for `update_run`; readers use `read_output`, which doesn't write.
+        """
+        if output_type in self.outputs:
+            return self.outputs[output_type].load()
+
+        o = run_output.RunOutput()
+        o.unmerged = getattr(self, f'{output_type}_unmerged')
+        o.append(getattr(self, output_type))
+
+        setattr(self, output_type, '')
+        setattr(self, f'{output_type}_unmerged', '')
+        self.outputs[output_type] = o.key
+        self.save()
+
+        return o
+
+    def read_output(self, output_type: str, start: int = 0, end: Optional[int] = None,
+                    tail: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Reads output from `start` to `end`, or the last `tail` characters
+        """
+        if output_type in self.outputs:
+            o = self.outputs[output_type].load()
+            size = o.total_size
+        else:
+            o = None
+            text = self.get_output_text(output_type)
+            size = len(text)
+
+        if tail is not None:
+            start = max(0, size - tail)
+            end = size
+        elif end is None or end > size:
+            end = size
+        start = min(start, end)
+
+        if o is not None:
+            output = o.read(start, end)
+        else:
+            output = text[start:end]
+
+        return {'output': output, 'start': start, 'end': end, 'size': size}
+
+    def get_output_text(self, output_type: str) -> str:
+        if output_type in self.outputs:
+            return self.outputs[output_type].load().read()
+
+        return getattr(self, output_type) + getattr(self, f'{output_type}_unmerged')
+
     def merge_output(self, unmerged: str, new: str) -> (str, str):
         unmerged += new
         processed = ''
@@ -189,21 +296,22 @@ class Run(Model['Run']):
 
     @staticmethod
     def format_output(output: str) -> (str, str):
+        """
+        Splits output into complete lines and the incomplete last line.
+        `\r` clears the line, unless it is part of `\r\n`.
+        """
+        lines = output.split('\n')
+
         res = []
-        temp = ''
-        for i, c in enumerate(output):
-            if c == '\n':
-                temp += '\n'
-                res.append(temp)
-                temp = ''
-            elif c == '\r' and len(output) > i + 1 and output[i + 1] == '\n':
-                pass
-            elif c == '\r':
-                temp = ''
-            else:
-                temp += c
-
-        return ''.join(res), temp
+        for line in lines[:-1]:
+            if line.endswith('\r'):
+                line = line[:-1]
+            res.append(line[line.rfind('\r') + 1:])
+            res.append('\n')
+
+        last = lines[-1]
+
+        return ''.join(res), last[last.rfind('\r') + 1:]
 
     @staticmethod
     def format_remote_repo(urls: str) -> str:
@@ -241,7 +349,7 @@ class Run(Model['Run']):
         else:
             is_project_run = False
 
-        configs = [{'key': k, **c} for k, c in self.configs.items()]
+        configs = [{'key': k, **c} for k, c in self.get_details().configs.items()]
         formatted_repo = self.format_remote_repo(self.repo_remotes)
 
         return {
@@ -263,9 +371,9 @@ class Run(Model['Run']):
             'size_tensorboard': self.size_tensorboard,
             'computer_uuid': self.computer_uuid,
             'configs': configs,
-            'stdout': self.stdout + self.stdout_unmerged,
-            'logger': self.logger + self.logger_unmerged,
-            'stderr': self.stderr + self.stderr_unmerged,
+            'stdout': self.get_output_text('stdout'),
+            'logger': self.get_output_text('logger'),
+            'stderr': self.get_output_text('stderr'),
         }
 
     def get_summary(self) -> Dict[str, str]:
@@ -287,6 +395,8 @@ class Run(Model['Run']):
 
         self.save()
 
+        run_summary.update_run(self)
+
 
 class RunIndex(Index['Run']):
     pass
@@ -295,6 +405,17 @@ class RunIndex(Index['Run']):
 def get_or_create(request: Request, run_uuid: str, labml_token: str = '') -> 'Run':
     p = project.get_project(labml_token)
 
+    if run_uuid in p.runs:
+        return p.runs[run_uuid].load()
+
+    # other threads and worker processes may be adding to the project
+    with locks.lock(f'project_{labml_token}'):
+        return _create(request, run_uuid, labml_token)
+
+
+def _create(request: Request, run_uuid: str, labml_token: str) -> 'Run':
+    p = project.get_project(labml_token)
+
     if run_uuid in p.runs:
         return p.runs[run_uuid].load()
 
@@ -311,17 +432,21 @@ def get_or_create(request: Request, run_uuid: str, labml_token: str = '') -> 'Ru
     time_now = time.time()
 
     s = status.create_status()
+    d = details.RunDetails()
+    d.save()
     run = Run(run_uuid=run_uuid,
               owner=identifier,
               start_time=time_now,
               run_ip=request.client.host,
               is_claimed=is_claimed,
               status=s.key,
+              details=d.key,
               )
-    p.runs[run.run_uuid] = run.key
-    p.is_run_added = True
-
     run.save()
+
+    run_summary.create(run, s)
+    p.insert_run(run)
+    p.is_run_added = True
     p.save()
 
     RunIndex.set(run.run_uuid, run.key)
@@ -339,23 +464,23 @@ def delete(run_uuid: str) -> None:
 
         computer.remove_run(r.computer_uuid, run_uuid)
 
+        for output_key in r.outputs.values():
+            o = output_key.load()
+            o.delete_chunks()
+            o.delete()
+
+        if r.details is not None:
+            r.details.delete()
+
         s.delete()
         r.delete()
 
         RunIndex.delete(run_uuid)
+        run_summary.delete(run_uuid)
 
         analyses.AnalysisManager.delete_run(run_uuid)
 
 
-def get_runs(labml_token: str) -> List['Run']:
-    res = []
-    p = project.get_project(labml_token)
-    for run_uuid, run_key in p.runs.items():
-        res.append(run_key.load())
-
-    return res
-
-
 def get(run_uuid: str) -> Optional['Run']:
     run_key = RunIndex.get(run_uuid)
 
@@ -0,0 +1,95 @@
+import bisect
+from typing import List, Optional
+
+from labml_db import Model, Key
+
+from . import batch
+
+CHUNK_SIZE = 64 * 1024
+OUTPUT_TYPES = ['stdout', 'logger', 'stderr']
+
+
+class OutputChunk(Model['OutputChunk']):
+    text: str
+
+    @classmethod
+    def defaults(cls):
+        return dict(text='')
+
+
+class RunOutput(Model['RunOutput']):
+    """
+    Output of a run stored in append-only chunks of about `CHUNK_SIZE` characters.
+    Only the last chunk is rewritten when output is appended, and reads load only the chunks they cover.
+    `offsets` has the starting position of each chunk, and `unmerged` is the incomplete last line.
+    """
+    chunks: List[Key[OutputChunk]]
+    offsets: List[int]
+    size: int
+    unmerged: str
+
+    @classmethod
+    def defaults(cls):
+        return dict(chunks=[],
+                    offsets=[],
+                    size=0,
+                    unmerged='',
+                    )
+
+    @property
+    def total_size(self) -> int:
+        return self.size + len(self.unmerged)
+
+    def append(self, text: str) -> None:
+        """
+        Appends processed output and saves.
+        Text is split at chunk boundaries, so that no chunk grows beyond `CHUNK_SIZE`.
+        """
+        chunks = []
+        while text:
+            if self.chunks and self.size - self.offsets[-1] < CHUNK_SIZE:
+                if not chunks:
+                    chunks.append(self.chunks[-1].load())
+            else:
+                chunks.append(OutputChunk())
+                self.chunks.append(chunks[-1].key)
+                self.offsets.append(self.size)
+
+            n = CHUNK_SIZE - (self.size - self.offsets[-1])
+            chunks[-1].text += text[:n]
+            self.size += len(text[:n])
+            text = text[n:]
+
+        if chunks:
+            OutputChunk.msave(chunks)
+
+        self.save()
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> str:
+        """
+        Reads output from `start` to `end`, including the unmerged last line
+        """
+        if end is None or end > self.total_size:
+            end = self.total_size
+        start = max(0, min(start, end))
+
+        res = []
+        if start < self.size:
+            first = bisect.bisect_right(self.offsets, start) - 1
+            last = bisect.bisect_left(self.offsets, min(end, self.size))
+            chunks = batch.load_keys(self.chunks[first:last])
+            text = ''.join(c.text for c in chunks)
+            offset = self.offsets[first]
+            res.append(text[start - offset:min(end, self.size) - offset])
+
+        if end > self.size:
+            res.append(self.unmerged[max(start - self.size, 0):end - self.size])
+
+        return ''.join(res)
+
+    def tail(self, n_chars: int) -> str:
+        return self.read(max(0, self.total_size - n_chars))
+
+    def delete_chunks(self) -> None:
+        for k in self.chunks:
+            k.delete()
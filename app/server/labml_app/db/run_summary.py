@@ -0,0 +1,159 @@
+from typing import Dict, List, Optional
+
+from labml_db import Model, Index, Key
+
+from . import batch
+from . import status
+
+STATUS_UPDATE_INTERVAL = 60
+
+
+class RunSummary(Model['RunSummary']):
+    """
+    Fields of a run shown in the runs list, kept apart from the run so that listing does not load run bodies.
+    `last_updated_time` is refreshed at most every `STATUS_UPDATE_INTERVAL` seconds.
+    """
+    run_uuid: str
+    computer_uuid: str
+    name: str
+    comment: str
+    start_time: float
+    size: float
+    run_status: Dict[str, any]
+    last_updated_time: float
+
+    @classmethod
+    def defaults(cls):
+        return dict(run_uuid='',
+                    computer_uuid='',
+                    name='',
+                    comment='',
+                    start_time=None,
+                    size=None,
+                    run_status={},
+                    last_updated_time=None,
+                    )
+
+    def set_run(self, r: 'run.Run') -> None:
+        self.run_uuid = r.run_uuid
+        self.computer_uuid = r.computer_uuid
+        self.name = r.name
+        self.comment = r.comment
+        self.start_time = r.start_time
+        self.size = r.size
+
+    def set_status(self, s: 'status.Status') -> None:
+        self.run_status = dict(s.get_run_status())
+        self.last_updated_time = s.last_updated_time
+
+    def get_data(self) -> Dict[str, any]:
+        run_status = dict(self.run_status)
+        run_status['status'] = status.get_true_status(run_status.get('status', ''), self.last_updated_time)
+
+        return {
+            'run_uuid': self.run_uuid,
+            'computer_uuid': self.computer_uuid,
+            'name': self.name,
+            'comment': self.comment,
+            'start_time': self.start_time,
+            'size': self.size,
+            'last_updated_time': self.last_updated_time,
+            'run_status': run_status,
+        }
+
+
+class RunSummaryIndex(Index['RunSummary']):
+    pass
+
+
+def _from_run(r: 'run.Run', s: 'status.Status', key: Optional[str] = None) -> RunSummary:
+    summary = RunSummary(key)
+    summary.set_run(r)
+    summary.set_status(s)
+
+    return summary
+
+
+def create(r: 'run.Run', s: 'status.Status') -> RunSummary:
+    summary_key = RunSummaryIndex.get(r.run_uuid)
+    summary = _from_run(r, s, str(summary_key) if summary_key else None)
+    summary.save()
+
+    RunSummaryIndex.set(r.run_uuid, summary.key)
+
+    return summary
+
+
+def update_run(r: 'run.Run') -> None:
+    summary_key = RunSummaryIndex.get(r.run_uuid)
+    if not summary_key:
+        create(r, r.status.load())
+        return
+
+    summary = summary_key.load()
+    summary.set_run(r)
+    summary.save()
+
+
+def update_status(r: 'run.Run', s: 'status.Status', prev_updated_time: Optional[float],
+                  is_status_changed: bool) -> None:
+    """
+    Called on every push, so the summary is only written when the status changes
+     or `last_updated_time` moves to a new interval
+    """
+    if not is_status_changed and prev_updated_time is not None:
+        if s.last_updated_time // STATUS_UPDATE_INTERVAL == prev_updated_time // STATUS_UPDATE_INTERVAL:
+            return
+
+    summary_key = RunSummaryIndex.get(r.run_uuid)
+    if not summary_key:
+        create(r, s)
+        return
+
+    summary = summary_key.load()
+    summary.set_status(s)
+    summary.save()
+
+
+def get_summaries(run_keys: Dict[str, Key['run.Run']]) -> Dict[str, RunSummary]:
+    """
+    Loads summaries of runs.
+    Runs added before summaries were kept get them built from the run, without saving,
+     until `scripts.migrate_run_summaries` or their next push creates them.
+    """
+    run_uuids = list(run_keys.keys())
+    summary_keys = RunSummaryIndex.mget(run_uuids)
+
+    res = {}
+    found = [(run_uuid, k) for run_uuid, k in zip(run_uuids, summary_keys) if k]
+    summaries = batch.load_keys([k for _, k in found])
+    for (run_uuid, _), summary in zip(found, summaries):
+        if summary:
+            res[run_uuid] = summary
+
+    missing = [run_uuid for run_uuid in run_uuids if run_uuid not in res]
+    runs = batch.load_keys([run_keys[run_uuid] for run_uuid in missing])
+    for run_uuid, r in zip(missing, runs):
+        if r:
+            res[run_uuid] = _from_run(r, r.status.load())
+
+    return res
+
+
+def count_summaries(run_uuids: List[str]) -> int:
+    """
+    Number of the runs that have summaries, from the index
+    """
+    if not run_uuids:
+        return 0
+
+    return sum(1 for k in RunSummaryIndex.mget(run_uuids) if k)
+
+
+def delete(run_uuid: str) -> None:
+    summary_key = RunSummaryIndex.get(run_uuid)
+
+    if summary_key:
+        summary_key.delete()
+        RunSummaryIndex.delete(run_uuid)
+
@@ -8,9 +8,12 @@ from .. import utils
 
 from .. import auth
 from . import user
+from . import batch
 from . import project
 from . import computer
 from . import status
+from . import details
+from . import locks
 from .. import settings
 from .. import analyses
 from ..enums import RunEnums
@@ -26,6 +29,7 @@ class Session(Model['Session']):
     session_uuid: str
     is_claimed: bool
     status: Key['status.Status']
+    details: Key['details.SessionDetails']
     configs: Dict[str, any]
     errors: List[Dict[str, str]]
 
@@ -40,6 +44,7 @@ class Session(Model['Session']):
                     is_claimed=True,
                     computer_ip='',
                     status=None,
+                    details=None,
                     configs={},
                     errors=[]
                     )
@@ -50,27 +55,61 @@ class Session(Model['Session']):
 
     @property
     def is_in_progress(self) -> bool:
-        s = get_status(self.session_uuid)
-
-        return s.get_true_status() == RunEnums.RUN_IN_PROGRESS
+        return status.get_cached_true_status(self.status) == RunEnums.RUN_IN_PROGRESS
 
     def update_session(self, data: Dict[str, any]) -> None:
         if not self.name:
             self.name = data.get('name', '')
         if not self.comment:
             self.comment = data.get('comment', '')
+        self.move_details()
         if 'configs' in data:
-            self.configs.update(data.get('configs', {}))
+            d = self.get_details()
+            d.configs.update(data.get('configs', {}))
+            d.save()
 
         self.save()
 
+    def get_details(self) -> 'details.SessionDetails':
+        """
+        Details are loaded on first access.
+        Sessions saved before details were stored separately have them built from the fields of the session,
+         without saving. `update_session` and `scripts/migrate_details.py` move them to `SessionDetails`.
+        """
+        if '_details' in self.__dict__:
+            return self._details
+
+        if self.details is not None:
+            self._details = self.details.load()
+        else:
+            self._details = details.SessionDetails(configs=self.configs, errors=self.errors)
+
+        return self._details
+
+    def move_details(self) -> bool:
+        """
+        Saves details of a session saved before they were stored separately to `SessionDetails`.
+        The caller saves the session.
+        """
+        if self.details is not None:
+            return False
+
+        d = self.get_details()
+        d.save()
+
+        self.configs = {}
+        self.errors = []
+        self.details = d.key
+
+        return True
+
     def get_data(self, request: Request) -> Dict[str, Union[str, any]]:
         is_project_session = False
         u = auth.get_auth_user(request)
         if u:
             is_project_session = u.default_project.is_project_session(self.session_uuid)
 
-        configs = [{'key': k, 'value': c} for k, c in self.configs.items()]
+        configs = [{'key': k, 'value': c} for k, c in self.get_details().configs.items()]
 
         return {
             'computer_uuid': self.computer_uuid,
@@ -108,6 +147,17 @@ class SessionIndex(Index['Session']):
 def get_or_create(request: Request, session_uuid: str, computer_uuid: str, labml_token: str = '') -> Session:
     p = project.get_project(labml_token)
 
+    if session_uuid in p.sessions:
+        return p.sessions[session_uuid].load()
+
+    # other threads and worker processes may be adding to the project
+    with locks.lock(f'project_{labml_token}'):
+        return _create(request, session_uuid, computer_uuid, labml_token)
+
+
+def _create(request: Request, session_uuid: str, computer_uuid: str, labml_token: str) -> Session:
+    p = project.get_project(labml_token)
+
     if session_uuid in p.sessions:
         return p.sessions[session_uuid].load()
 
@@ -125,6 +175,8 @@ def get_or_create(request: Request, session_uuid: str, computer_uuid: str, labml
     time_now = time.time()
 
     s = status.create_status()
+    d = details.SessionDetails()
+    d.save()
     session = Session(session_uuid=session_uuid,
                       computer_uuid=computer_uuid,
                       owner=identifier,
@@ -132,6 +184,7 @@ def get_or_create(request: Request, session_uuid: str, computer_uuid: str, labml
                       computer_ip=request.client.host,
                       is_claimed=is_claimed,
                       status=s.key,
+                      details=d.key,
                       )
     p.sessions[session.session_uuid] = session.key
 
@@ -156,6 +209,9 @@ def delete(session_uuid: str) -> None:
 
         computer.remove_session(ss.computer_uuid, session_uuid)
 
+        if ss.details is not None:
+            ss.details.delete()
+
         s.delete()
         ss.delete()
 
@@ -165,12 +221,9 @@ def delete(session_uuid: str) -> None:
 
 
 def get_sessions(labml_token: str) -> List[Session]:
-    res = []
     p = project.get_project(labml_token)
-    for session_uuid, session_key in p.sessions.items():
-        res.append(session_key.load())
 
-    return res
+    return batch.load_keys(list(p.sessions.values()))
 
 
 def get(session_uuid: str) -> Optional[Session]:
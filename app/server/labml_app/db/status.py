@@ -1,10 +1,53 @@
+import threading
 import time
-from typing import Dict
+from collections import OrderedDict
+from typing import Dict, Optional
 
 from labml_db import Model, Key
 
 from ..enums import RunEnums
 
+STATUS_CACHE_SIZE = 4096
+STATUS_CACHE_TTL = 10
+
+
+class StatusCache:
+    """
+    `last_updated_time` and run status of recently used statuses, keyed by the status key.
+    Entries are replaced when a status is updated in this process,
+     and expire after `STATUS_CACHE_TTL` seconds to pick up updates from other processes.
+    """
+    _entries: OrderedDict
+
+    def __init__(self, max_size: int = STATUS_CACHE_SIZE, ttl: float = STATUS_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, any]]:
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                self._entries.pop(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, data: Dict[str, any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), data)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_cache = StatusCache()
+
 
 class RunStatus(Model['RunStatusModel']):
     status: str
@@ -29,8 +72,21 @@ class Status(Model['Status']):
                     run_status=None
                     )
 
+    def get_run_status(self) -> Dict[str, any]:
+        data = _cache.get(str(self.key))
+        if data is None:
+            data = self._cache_data(self.run_status.load().to_dict())
+
+        return data['run_status']
+
+    def _cache_data(self, run_status: Dict[str, any]) -> Dict[str, any]:
+        data = {'last_updated_time': self.last_updated_time, 'run_status': run_status}
+        _cache.set(str(self.key), data)
+
+        return data
+
     def get_data(self) -> Dict[str, any]:
-        run_status = self.run_status.load().to_dict()
+        run_status = dict(self.get_run_status())
         run_status['status'] = self.get_true_status(run_status.get('status', ''))
 
         return {
@@ -50,26 +106,45 @@ class Status(Model['Status']):
             run_status.time = s.get('time', run_status.time)
 
             run_status.save()
+            self._cache_data(run_status.to_dict())
+        else:
+            self._cache_data(self.get_run_status())
 
         self.save()
 
     def get_true_status(self, status: str = None) -> str:
         if not status:
-            status = self.run_status.load().status
-        not_responding = False
-
-        if status == RunEnums.RUN_IN_PROGRESS:
-            if self.last_updated_time is not None:
-                time_diff = (time.time() - self.last_updated_time) / 60
-                if time_diff > 15:
-                    not_responding = True
-
-        if not_responding:
-            return RunEnums.RUN_NOT_RESPONDING
-        elif status == '':
-            return RunEnums.RUN_UNKNOWN
-        else:
-            return status
+            status = self.get_run_status().get('status', '')
+
+        return get_true_status(status, self.last_updated_time)
+
+
+def get_cached_true_status(status_key: Key[Status]) -> str:
+    """
+    True status from the cache, loading the status only if it's not cached
+    """
+    data = _cache.get(str(status_key))
+    if data is None:
+        return status_key.load().get_true_status()
+
+    return get_true_status(data['run_status'].get('status', ''), data['last_updated_time'])
+
+
+def get_true_status(status: str, last_updated_time: Optional[float]) -> str:
+    not_responding = False
+
+    if status == RunEnums.RUN_IN_PROGRESS:
+        if last_updated_time is not None:
+            time_diff = (time.time() - last_updated_time) / 60
+            if time_diff > 15:
+                not_responding = True
+
+    if not_responding:
+        return RunEnums.RUN_NOT_RESPONDING
+    elif status == '':
+        return RunEnums.RUN_UNKNOWN
+    else:
+        return status
 
 
 def create_status() -> Status:
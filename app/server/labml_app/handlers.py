@@ -1,6 +1,7 @@
 import sys
 import asyncio
-from typing import Callable, Dict, Any
+import inspect
+from typing import Callable, Dict, Any, List
 
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
@@ -9,6 +10,8 @@ from .logger import logger
 from . import settings
 from . import auth
 from .db import run
+from .db import run_output
+from .db import run_summary
 from .db import computer
 from .db import session
 from .db import app_token
@@ -16,8 +19,13 @@ from .db import user
 from .db import project
 from .db import blocked_uuids
 from .db import job
+from .db import job_hub
+from .db import batch
 from . import utils
+from .utils import packets
+from .utils import executors
 from . import analyses
+from . import ingest
 
 try:
     import requests
@@ -26,6 +34,29 @@ except ImportError:
 
 EndPointRes = Dict[str, Any]
 
+POLLING_TIMEOUT = 48
+
+_pushes_in_progress = 0
+
+
+def _get_push_interval() -> float:
+    """
+    Seconds a client should wait before its next push.
+    This grows with the number of pushes being processed, so that clients back off when the server is busy.
+    """
+    load = _pushes_in_progress / settings.PUSH_CONCURRENCY
+
+    return settings.PUSH_INTERVAL * max(1., load)
+
+
+async def _throttle_old_client(labml_version: str) -> None:
+    """
+    Clients older than `PUSH_INTERVAL_LABML_VERSION` push again as soon as a push returns,
+     so they are held for `PUSH_INTERVAL` seconds
+    """
+    if utils.check_version(labml_version, settings.PUSH_INTERVAL_LABML_VERSION):
+        await asyncio.sleep(settings.PUSH_INTERVAL)
+
 
 def _is_new_run_added(request: Request) -> bool:
     is_run_added = False
@@ -74,9 +105,41 @@ def sign_out(request: Request) -> EndPointRes:
     return {'is_successful': True}
 
 
-@utils.mix_panel.MixPanelEvent.time_this(0.4)
-async def _update_run(request: Request, labml_token: str, run_uuid: str, labml_version: str):
+async def _get_packets(request: Request) -> List[Dict[str, Any]]:
+    """
+    Raises `packets.PacketError` for malformed bodies
+    """
+    if request.headers.get('Content-Type', '') == packets.CONTENT_TYPE:
+        return packets.decode(await request.body())
+
+    try:
+        json = await request.json()
+    except ValueError as e:
+        raise packets.PacketError(f'invalid JSON: {e}')
+
+    if not isinstance(json, list):
+        json = [json]
+    if not all(isinstance(p, dict) for p in json):
+        raise packets.PacketError('packets should be JSON objects')
+
+    return json
+
+
+def _invalid_packets_response(e: packets.PacketError) -> JSONResponse:
+    response = JSONResponse({'errors': [{'error': 'invalid_packets', 'message': str(e)}]})
+    response.status_code = 400
+
+    return response
+
+
+def _apply_run_packets(request: Request, labml_token: str, run_uuid: str, labml_version: str,
+                       data: List[Dict[str, Any]]):
+    """
+    Blocking part of `update_run`.
+    Returns the response and the track data to queue for the analyses.
+    """
     errors = []
+    tracks = []
 
     token = labml_token
 
@@ -84,20 +147,20 @@ async def _update_run(request: Request, labml_token: str, run_uuid: str, labml_v
         error = {'error': 'blocked_run_uuid',
                  'message': f'Blocked or deleted run, uuid:{run_uuid}'}
         errors.append(error)
-        return {'errors': errors}
+        return {'errors': errors}, tracks
 
     if len(run_uuid) < 10:
         error = {'error': 'invalid_run_uuid',
                  'message': f'Invalid Run UUID'}
         errors.append(error)
-        return {'errors': errors}
+        return {'errors': errors}, tracks
 
     if utils.check_version(labml_version, settings.LABML_VERSION):
         error = {'error': 'labml_outdated',
                  'message': f'Your labml client is outdated, please upgrade: '
                             'pip install labml --upgrade'}
         errors.append(error)
-        return {'errors': errors}
+        return {'errors': errors}, tracks
 
     p = project.get_project(labml_token=token)
     if not p:
@@ -120,17 +183,16 @@ async def _update_run(request: Request, labml_token: str, run_uuid: str, labml_v
     r = run.get_or_create(request, run_uuid, token)
     s = r.status.load()
 
-    json = await request.json()
-    if isinstance(json, list):
-        data = json
-    else:
-        data = [json]
-
+    prev_updated_time = s.last_updated_time
+    is_status_changed = False
     for d in data:
         r.update_run(d)
         s.update_time_status(d)
+        is_status_changed = is_status_changed or bool(d.get('status', {}))
         if 'track' in d:
-            analyses.AnalysisManager.track(run_uuid, d['track'])
+            tracks.append(d['track'])
+
+    run_summary.update_status(r, s, prev_updated_time, is_status_changed)
 
     if r.is_sync_needed or not r.is_in_progress:
         c = computer.get_or_create(r.computer_uuid)
@@ -141,25 +203,51 @@ async def _update_run(request: Request, labml_token: str, run_uuid: str, labml_v
 
     hp_values = analyses.AnalysisManager.get_experiment_analysis('HyperParamsAnalysis', run_uuid).get_hyper_params()
 
-    return {'errors': errors, 'url': r.url, 'dynamic': hp_values}
+    return {'errors': errors, 'url': r.url, 'dynamic': hp_values}, tracks
+
+
+@utils.mix_panel.MixPanelEvent.time_this(0.4)
+async def _update_run(request: Request, labml_token: str, run_uuid: str, labml_version: str):
+    data = await _get_packets(request)
+    res, tracks = await executors.run_db(_apply_run_packets, request, labml_token, run_uuid, labml_version, data)
+
+    # the ingest queue is only accessed from the event loop
+    for track in tracks:
+        ingest.run_queue.put(run_uuid, track)
+
+    return res
 
 
 async def update_run(request: Request) -> EndPointRes:
+    global _pushes_in_progress
+
     labml_token = request.query_params.get('labml_token', '')
     run_uuid = request.query_params.get('run_uuid', '')
     labml_version = request.query_params.get('labml_version', '')
 
-    res = await _update_run(request, labml_token, run_uuid, labml_version)
+    _pushes_in_progress += 1
+    try:
+        res = await _update_run(request, labml_token, run_uuid, labml_version)
+        res['push_interval'] = _get_push_interval()
+        res['accept'] = [packets.CONTENT_TYPE]
+    except packets.PacketError as e:
+        return _invalid_packets_response(e)
+    finally:
+        _pushes_in_progress -= 1
 
-    await asyncio.sleep(3)
+    await _throttle_old_client(labml_version)
 
     return res
 
 
-@utils.mix_panel.MixPanelEvent.time_this(0.4)
-async def _update_session(request: Request, labml_token: str, session_uuid: str, computer_uuid: str,
-                          labml_version: str):
+def _apply_session_packets(request: Request, labml_token: str, session_uuid: str, computer_uuid: str,
+                           labml_version: str, data: List[Dict[str, Any]]):
+    """
+    Blocking part of `update_session`.
+    Returns the response and the track data to queue for the analyses.
+    """
     errors = []
+    tracks = []
 
     token = labml_token
 
@@ -167,26 +255,26 @@ async def _update_session(request: Request, labml_token: str, session_uuid: str,
         error = {'error': 'blocked_session_uuid',
                  'message': f'Blocked or deleted session, uuid:{session_uuid}'}
         errors.append(error)
-        return {'errors': errors}
+        return {'errors': errors}, tracks
 
     if len(computer_uuid) < 10:
         error = {'error': 'invalid_computer_uuid',
                  'message': f'Invalid Computer UUID'}
         errors.append(error)
-        return {'errors': errors}
+        return {'errors': errors}, tracks
 
     if len(session_uuid) < 10:
         error = {'error': 'invalid_session_uuid',
                  'message': f'Invalid Session UUID'}
         errors.append(error)
-        return {'errors': errors}
+        return {'errors': errors}, tracks
 
     if utils.check_version(labml_version, settings.LABML_VERSION):
         error = {'error': 'labml_outdated',
                  'message': f'Your labml client is outdated, please upgrade: '
                             'pip install labml --upgrade'}
         errors.append(error)
-        return {'errors': errors}
+        return {'errors': errors}, tracks
 
     p = project.get_project(labml_token=token)
     if not p:
@@ -209,33 +297,50 @@ async def _update_session(request: Request, labml_token: str, session_uuid: str,
     c = session.get_or_create(request, session_uuid, computer_uuid, token)
     s = c.status.load()
 
-    json = await request.json()
-    if isinstance(json, list):
-        data = json
-    else:
-        data = [json]
-
     for d in data:
         c.update_session(d)
         s.update_time_status(d)
         if 'track' in d:
-            analyses.AnalysisManager.track_computer(session_uuid, d['track'])
+            tracks.append(d['track'])
 
     logger.debug(
         f'update_session, session_uuid: {session_uuid}, size : {sys.getsizeof(str(request.json)) / 1024} Kb')
 
-    return {'errors': errors, 'url': c.url}
+    return {'errors': errors, 'url': c.url}, tracks
+
+
+@utils.mix_panel.MixPanelEvent.time_this(0.4)
+async def _update_session(request: Request, labml_token: str, session_uuid: str, computer_uuid: str,
+                          labml_version: str):
+    data = await _get_packets(request)
+    res, tracks = await executors.run_db(_apply_session_packets, request, labml_token, session_uuid, computer_uuid,
+                                         labml_version, data)
+
+    for track in tracks:
+        ingest.session_queue.put(session_uuid, track)
+
+    return res
 
 
 async def update_session(request: Request) -> EndPointRes:
+    global _pushes_in_progress
+
     labml_token = request.query_params.get('labml_token', '')
     session_uuid = request.query_params.get('session_uuid', '')
     computer_uuid = request.query_params.get('computer_uuid', '')
     labml_version = request.query_params.get('labml_version', '')
 
-    res = await _update_session(request, labml_token, session_uuid, computer_uuid, labml_version)
+    _pushes_in_progress += 1
+    try:
+        res = await _update_session(request, labml_token, session_uuid, computer_uuid, labml_version)
+        res['push_interval'] = _get_push_interval()
+        res['accept'] = [packets.CONTENT_TYPE]
+    except packets.PacketError as e:
+        return _invalid_packets_response(e)
+    finally:
+        _pushes_in_progress -= 1
 
-    await asyncio.sleep(3)
+    await _throttle_old_client(labml_version)
 
     return res
 
@@ -255,7 +360,7 @@ def claim_run(request: Request, run_uuid: str) -> EndPointRes:
         float_project = project.get_project(labml_token=settings.FLOAT_PROJECT_TOKEN)
 
         if r.run_uuid in float_project.runs:
-            default_project.runs[r.run_uuid] = r.key
+            default_project.insert_run(r)
             default_project.is_run_added = True
             default_project.save()
             r.is_claimed = True
@@ -354,6 +459,35 @@ async def edit_session(request: Request, session_uuid: str) -> EndPointRes:
     return {'errors': errors}
 
 
+@utils.mix_panel.MixPanelEvent.time_this(None)
+def get_run_output(request: Request, run_uuid: str, output_type: str) -> JSONResponse:
+    """End point to read a part of run output. start, end: character offsets, or tail: number of last characters
+            """
+    output_data = {}
+    status_code = 404
+
+    try:
+        params = {k: int(request.query_params[k]) for k in ['start', 'end', 'tail'] if k in request.query_params}
+    except ValueError:
+        params = {'start': -1}
+
+    if any(v < 0 for v in params.values()):
+        response = JSONResponse({'error': 'start, end and tail should be non-negative integers'})
+        response.status_code = 400
+
+        return response
+
+    r = run.get(run_uuid)
+    if r and output_type in run_output.OUTPUT_TYPES:
+        output_data = r.read_output(output_type, **params)
+        status_code = 200
+
+    response = JSONResponse(output_data)
+    response.status_code = status_code
+
+    return response
+
+
 @utils.mix_panel.MixPanelEvent.time_this(None)
 def get_run_status(request: Request, run_uuid: str) -> JSONResponse:
     status_data = {}
@@ -393,21 +527,28 @@ def get_runs(request: Request, labml_token: str) -> EndPointRes:
     u = auth.get_auth_user(request)
 
     if labml_token:
-        runs_list = run.get_runs(labml_token)
+        p = project.get_project(labml_token)
     else:
-        default_project = u.default_project
-        labml_token = default_project.labml_token
-        runs_list = default_project.get_runs()
+        p = u.default_project
+        labml_token = p.labml_token
 
-    res = []
-    for r in runs_list:
-        s = run.get_status(r.run_uuid)
-        if r.run_uuid:
-            res.append({**r.get_summary(), **s.get_data()})
+    try:
+        start = int(request.query_params.get('start', 0))
+        limit = int(request.query_params.get('limit', 0))
+    except ValueError:
+        start, limit = -1, -1
 
-    res = sorted(res, key=lambda i: i['start_time'], reverse=True)
+    if start < 0 or limit < 0:
+        response = JSONResponse({'error': 'start and limit should be non-negative integers'})
+        response.status_code = 400
+
+        return response
+
+    res, total = p.get_run_summaries(start, limit)
+    if p.is_run_added:
+        project.clear_run_added(labml_token)
 
-    return {'runs': res, 'labml_token': labml_token}
+    return {'runs': res, 'labml_token': labml_token, 'total': total}
 
 
 @auth.login_required
@@ -423,10 +564,12 @@ def get_sessions(request: Request, labml_token: str) -> EndPointRes:
         labml_token = default_project.labml_token
         sessions_list = default_project.get_sessions()
 
+    sessions_list = [c for c in sessions_list if c]
+    statuses = batch.load_keys([c.status for c in sessions_list])
+
     res = []
-    for c in sessions_list:
-        s = session.get_status(c.session_uuid)
-        if c.session_uuid:
+    for c, s in zip(sessions_list, statuses):
+        if c.session_uuid and s:
             res.append({**c.get_summary(), **s.get_data()})
 
     res = sorted(res, key=lambda i: i['start_time'], reverse=True)
@@ -509,6 +652,12 @@ def is_user_logged(request: Request) -> EndPointRes:
     return {'is_user_logged': auth.get_is_user_logged(request)}
 
 
+def _sync_runs(computer_uuid: str, runs: List[str]) -> Dict[str, List[str]]:
+    c = computer.get_or_create(computer_uuid)
+
+    return c.sync_runs(runs)
+
+
 @utils.mix_panel.MixPanelEvent.time_this(None)
 async def sync_computer(request: Request) -> EndPointRes:
     """End point to sync UI-server and UI-computer. runs: to sync with the server.
@@ -522,15 +671,30 @@ async def sync_computer(request: Request) -> EndPointRes:
         errors.append(error)
         return {'errors': errors}
 
-    c = computer.get_or_create(computer_uuid)
-
     json = await request.json()
     runs = json.get('runs', [])
-    res = c.sync_runs(runs)
+    res = await executors.run_db(_sync_runs, computer_uuid, runs)
 
     return {'runs': res}
 
 
+def _sync_jobs(computer_uuid: str, job_responses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    c = computer.get_or_create(computer_uuid)
+
+    c.update_last_online()
+
+    if job_responses:
+        c.sync_jobs(job_responses)
+
+    return c.get_pending_jobs()
+
+
+def _get_pending_jobs(computer_uuid: str) -> List[Dict[str, Any]]:
+    c = computer.get_or_create(computer_uuid)
+
+    return c.get_pending_jobs()
+
+
 @utils.mix_panel.MixPanelEvent.time_this(60.4)
 async def polling(request: Request) -> EndPointRes:
     """End point to sync UI-server and UI-computer. jobs: statuses of jobs.
@@ -545,23 +709,17 @@ async def polling(request: Request) -> EndPointRes:
         errors.append(error)
         return {'errors': errors}
 
-    c = computer.get_or_create(computer_uuid)
-
-    c.update_last_online()
-
     json = await request.json()
     job_responses = json.get('jobs', [])
-    if job_responses:
-        c.sync_jobs(job_responses)
-
-    pending_jobs = []
-    for i in range(16):
-        c = computer.get_or_create(computer_uuid)
-        pending_jobs = c.get_pending_jobs()
-        if pending_jobs:
-            break
 
-        await asyncio.sleep(3)
+    hub = job_hub.get_hub()
+    waiter = hub.subscribe(computer_uuid)
+    try:
+        pending_jobs = await executors.run_db(_sync_jobs, computer_uuid, job_responses)
+        if not pending_jobs and await waiter.wait(POLLING_TIMEOUT):
+            pending_jobs = await executors.run_db(_get_pending_jobs, computer_uuid)
+    finally:
+        hub.unsubscribe(waiter)
 
     return {'jobs': pending_jobs}
 
@@ -651,6 +809,7 @@ def add_handlers(app: FastAPI):
     _add_ui(app, 'PUT', add_run, 'run/{run_uuid}/add')
     _add_ui(app, 'PUT', claim_run, 'run/{run_uuid}/claim')
     _add_ui(app, 'GET', get_run_status, 'run/status/{run_uuid}')
+    _add_ui(app, 'GET', get_run_output, 'run/{run_uuid}/output/{output_type}')
 
     _add_ui(app, 'GET', get_session, 'session/{session_uuid}')
     _add_ui(app, 'POST', edit_session, 'session/{session_uuid}')
@@ -666,6 +825,8 @@ def add_handlers(app: FastAPI):
     _add_ui(app, 'POST', clear_checkpoints, 'clear_checkpoints/{computer_uuid}')
 
     for method, func, url, login_required in analyses.AnalysisManager.get_handlers():
+        if not inspect.iscoroutinefunction(func):
+            func = executors.in_compute(func)
         if login_required:
             func = auth.login_required(func)
 
@@ -0,0 +1,122 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set, Callable, Optional
+
+import numpy as np
+
+from .logger import logger
+from . import settings
+from . import analyses
+from .db import locks
+from .analyses.series import SeriesModel
+
+TrackData = Dict[str, SeriesModel]
+
+
+def _as_array(value) -> np.ndarray:
+    """
+    Values of non-numeric series, like process names, are kept as objects
+    """
+    try:
+        return np.asarray(value, dtype=float)
+    except (TypeError, ValueError):
+        return np.asarray(value, dtype=object)
+
+
+def coalesce(tracks: List[TrackData]) -> TrackData:
+    """
+    Joins track data of consecutive packets of a run into one update
+    """
+    if len(tracks) == 1:
+        return tracks[0]
+
+    steps: Dict[str, list] = {}
+    values: Dict[str, list] = {}
+    for track in tracks:
+        for ind, series in track.items():
+            if ind not in steps:
+                steps[ind] = []
+                values[ind] = []
+            steps[ind].append(np.asarray(series['step'], dtype=float))
+            values[ind].append(_as_array(series['value']))
+
+    return {ind: {'step': np.concatenate(steps[ind]), 'value': np.concatenate(values[ind])} for ind in steps}
+
+
+class IngestQueue:
+    """
+    Applies track data of runs in the background.
+    Packets of a run that arrive while it is waiting or being processed are coalesced into one update,
+     and a run is never processed by two workers at the same time, in this or other processes.
+    The queue state is only accessed from the event loop, and updates run on the queue's own threads,
+     so that they don't wait behind requests.
+    """
+    _pending: Dict[str, List[TrackData]]
+    _processing: Set[str]
+
+    def __init__(self, apply: Callable[[str, TrackData], None], n_workers: int):
+        self.apply = apply
+        self.n_workers = n_workers
+        self._pending = {}
+        self._processing = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor = ThreadPoolExecutor(n_workers, thread_name_prefix='labml_ingest')
+
+    def _start(self) -> None:
+        self._loop = asyncio.get_event_loop()
+        self._queue = asyncio.Queue()
+        self._pending = {}
+        self._processing = set()
+        for _ in range(self.n_workers):
+            asyncio.ensure_future(self._work())
+
+    def put(self, uuid: str, track: TrackData) -> None:
+        if self._loop is not asyncio.get_event_loop():
+            self._start()
+
+        if uuid in self._pending:
+            self._pending[uuid].append(track)
+            return
+
+        self._pending[uuid] = [track]
+        if uuid not in self._processing:
+            self._queue.put_nowait(uuid)
+
+    def _apply_locked(self, uuid: str, track: TrackData) -> None:
+        """
+        Other worker processes may get packets of the same run.
+        Packets that arrive while waiting for the lock are coalesced into the next update.
+        """
+        with locks.lock(uuid):
+            self.apply(uuid, track)
+
+    async def _work(self) -> None:
+        loop = self._loop
+        while True:
+            uuid = await self._queue.get()
+            tracks = self._pending.pop(uuid)
+            self._processing.add(uuid)
+            try:
+                await loop.run_in_executor(self._executor, self._apply_locked, uuid, coalesce(tracks))
+            except locks.LockTimeoutError:
+                logger.warning(f'timed out waiting for the lock of {uuid}, retrying')
+                self._pending[uuid] = tracks + self._pending.get(uuid, [])
+            except Exception as e:
+                logger.error(f'error while applying track data of {uuid}: {e}')
+            finally:
+                self._processing.discard(uuid)
+                if uuid in self._pending:
+                    self._queue.put_nowait(uuid)
+                self._queue.task_done()
+
+    async def join(self) -> None:
+        """
+        Waits until all queued track data is applied
+        """
+        if self._queue is not None:
+            await self._queue.join()
+
+
+run_queue = IngestQueue(analyses.AnalysisManager.track, settings.INGEST_WORKERS)
+session_queue = IngestQueue(analyses.AnalysisManager.track_computer, settings.INGEST_WORKERS)
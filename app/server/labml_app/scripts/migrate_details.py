@@ -0,0 +1,32 @@
+from labml_app.logger import logger
+from labml_app.db import init_db
+from labml_app.db.run import Run
+from labml_app.db.session import Session
+
+
+def migrate_details() -> None:
+    """
+    Moves configs, indicators and errors of runs and sessions saved before details were stored separately
+     to `RunDetails` and `SessionDetails`
+    """
+    for m in [Run, Session]:
+        logger.info('migrating: ' + m.__name__)
+
+        model_keys = m.get_all()
+        migrated = 0
+        for model_key in model_keys:
+            try:
+                r = model_key.load()
+                if r.move_details():
+                    r.save()
+                    migrated += 1
+            except Exception as e:
+                logger.error(f'error while migrating {model_key}: {e}')
+
+        logger.info(f'......Done: {migrated} of {len(model_keys)}.........')
+
+
+if __name__ == "__main__":
+    init_db()
+
+    migrate_details()
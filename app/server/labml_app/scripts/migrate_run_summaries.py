@@ -0,0 +1,29 @@
+from labml_app.logger import logger
+from labml_app.db import init_db, locks
+from labml_app.db.project import Project
+
+
+def migrate_run_summaries() -> None:
+    """
+    Creates summaries of runs added before `RunSummary` was kept, and their `runs_by_start_time` entries
+    """
+    project_keys = Project.get_all()
+    migrated = 0
+    for project_key in project_keys:
+        try:
+            labml_token = project_key.load().labml_token
+            with locks.lock(f'project_{labml_token}'):
+                p = project_key.load()
+                if p.sync_runs_by_start_time():
+                    p.save()
+                    migrated += 1
+        except Exception as e:
+            logger.error(f'error while migrating {project_key}: {e}')
+
+    logger.info(f'......Done: {migrated} of {len(project_keys)}.........')
+
+
+if __name__ == "__main__":
+    init_db()
+
+    migrate_run_summaries()
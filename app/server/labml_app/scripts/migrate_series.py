@@ -0,0 +1,40 @@
+from labml_app.logger import logger
+from labml_app.db import Models, init_db
+from labml_app.analyses.series_collection import SeriesCollection
+
+
+def migrate_series() -> None:
+    """
+    Moves the series stored inline in `tracking` of `MetricsModel`, `GradientsModel`, etc.
+     into their own `SeriesDataModel` records
+    Run it with the server stopped, since collections are saved here without the run locks that `track` holds.
+    """
+    for s, m in Models:
+        if not issubclass(m, SeriesCollection):
+            continue
+
+        logger.info('migrating: ' + m.__name__)
+
+        model_keys = m.get_all()
+        migrated = 0
+        for model_key in model_keys:
+            try:
+                c = model_key.load()
+                if not c.tracking:
+                    continue
+
+                for ind, track in c.get_all_series().items():
+                    if ind in c.tracking:
+                        c.set_series(ind, track)
+                c.save_series()
+                migrated += 1
+            except Exception as e:
+                logger.error(f'error while migrating {model_key}: {e}')
+
+        logger.info(f'......Done: {migrated} of {len(model_keys)}.........')
+
+
+if __name__ == "__main__":
+    init_db()
+
+    migrate_series()
@@ -14,3 +14,18 @@ IS_MIX_PANEL = False
 IS_LOCAL_SETUP = True
 INDICATOR_LIMIT = 100
 IS_LOGIN_REQUIRED = True
+PUSH_INTERVAL = 3
+PUSH_CONCURRENCY = 16
+# clients older than this ignore push_interval, so the server holds their pushes for PUSH_INTERVAL seconds
+PUSH_INTERVAL_LABML_VERSION = '0.4.127'
+INGEST_WORKERS = 4
+DB_THREADS = 16
+COMPUTE_THREADS = 4
+REDIS_HOST = 'localhost'
+REDIS_PORT = 6379
+REDIS_DB = 0
+REDIS_SERIES_DB = 0
+REDIS_MAX_CONNECTIONS = 64
+REDIS_POOL_TIMEOUT = 10
+REDIS_SOCKET_TIMEOUT = 10
+REDIS_HEALTH_CHECK_INTERVAL = 30
@@ -0,0 +1,40 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any
+
+from .. import settings
+
+_db_executor = ThreadPoolExecutor(settings.DB_THREADS, thread_name_prefix='labml_db')
+_compute_executor = ThreadPoolExecutor(settings.COMPUTE_THREADS, thread_name_prefix='labml_compute')
+
+
+async def run_db(func: Callable, *args, **kwargs) -> Any:
+    """
+    Runs blocking database calls off the event loop
+    """
+    loop = asyncio.get_event_loop()
+
+    return await loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_compute(func: Callable, *args, **kwargs) -> Any:
+    """
+    Runs series computations off the event loop.
+    These have their own threads, so that slow ones don't hold up database calls of other requests.
+    """
+    loop = asyncio.get_event_loop()
+
+    return await loop.run_in_executor(_compute_executor, functools.partial(func, *args, **kwargs))
+
+
+def in_compute(func: Callable) -> Callable:
+    """
+    Makes a handler that runs `func` with `run_compute`
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_compute(func, *args, **kwargs)
+
+    return wrapper
@@ -9,6 +9,7 @@ from typing import NamedTuple, Dict, Union, Callable
 from fastapi import Request
 
 from . import slack
+from . import executors
 
 try:
     import mixpanel
@@ -107,7 +108,7 @@ class Event:
                 if inspect.iscoroutinefunction(func):
                     r = await func(request, *args, **kwargs)
                 else:
-                    r = func(request, *args, **kwargs)
+                    r = await executors.run_db(func, request, *args, **kwargs)
 
                 end = time.time()
 
@@ -0,0 +1,117 @@
+import gzip
+import json
+import struct
+import zlib
+from typing import List, Dict, Any
+
+import numpy as np
+
+CONTENT_TYPE = 'application/x-labml-packets'
+
+HEADER_SIZE = struct.Struct('<I')
+
+# limit of the decompressed size of a request body
+MAX_DECODED_SIZE = 256 * 1024 * 1024
+
+
+class PacketError(ValueError):
+    """
+    Raised when a request body is not valid packets
+    """
+    pass
+
+
+def _decompress(body: bytes) -> bytes:
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = d.decompress(body, MAX_DECODED_SIZE + 1)
+    except zlib.error as e:
+        raise PacketError(f'not gzip compressed: {e}')
+
+    if len(data) > MAX_DECODED_SIZE or d.unconsumed_tail:
+        raise PacketError(f'more than {MAX_DECODED_SIZE} bytes decompressed')
+    if not d.eof:
+        raise PacketError('truncated gzip stream')
+
+    return data
+
+
+def encode(data: List[Dict[str, Any]]) -> bytes:
+    """
+    Encodes packets the way the client does, for `decode`
+    """
+    header = []
+    buffers = []
+    for p in data:
+        if 'track' not in p:
+            header.append(p)
+            continue
+
+        track = {}
+        for ind, series in p['track'].items():
+            try:
+                step = np.asarray(series['step'], dtype='<f8')
+                value = np.asarray(series['value'], dtype='<f8')
+            except (TypeError, ValueError):
+                track[ind] = series
+                continue
+            track[ind] = {'n': len(step)}
+            buffers += [step.tobytes(), value.tobytes()]
+
+        header.append({**p, 'track': track})
+
+    header = json.dumps(header).encode('utf-8')
+
+    return gzip.compress(b''.join([HEADER_SIZE.pack(len(header)), header, *buffers]), compresslevel=6)
+
+
+def decode(body: bytes) -> List[Dict[str, Any]]:
+    """
+    Decodes gzip compressed binary packets.
+
+    The payload is the length of a JSON header as a little endian `uint32`, the header,
+     and then the float64 buffers of tracked series.
+    The header is the list of packets, with each numeric `track` series given as `{'n': length}`.
+    Series that are not numeric, like process names, are in the header as they are.
+    Buffers are in the order of packets and series in the header, `step` followed by `value`.
+    Raises `PacketError` for bodies that are not valid, or that decompress to more than `MAX_DECODED_SIZE` bytes.
+    """
+    data = _decompress(body)
+
+    if len(data) < HEADER_SIZE.size:
+        raise PacketError('missing header size')
+    header_size, = HEADER_SIZE.unpack_from(data, 0)
+    offset = HEADER_SIZE.size + header_size
+    if offset > len(data):
+        raise PacketError('header is longer than the payload')
+
+    try:
+        packets = json.loads(data[HEADER_SIZE.size:offset].decode('utf-8'))
+    except ValueError as e:
+        raise PacketError(f'invalid header: {e}')
+    if not isinstance(packets, list) or not all(isinstance(p, dict) for p in packets):
+        raise PacketError('header should be a list of packets')
+
+    for p in packets:
+        track = p.get('track', {})
+        if not isinstance(track, dict):
+            raise PacketError('track should be a dictionary of series')
+        for ind, series in track.items():
+            if not isinstance(series, dict):
+                raise PacketError(f'invalid series: {ind}')
+            if 'n' not in series:
+                continue
+            n = series['n']
+            if not isinstance(n, int) or isinstance(n, bool) or n < 0:
+                raise PacketError(f'invalid length of series {ind}: {n}')
+            if offset + 2 * n * 8 > len(data):
+                raise PacketError(f'buffers of series {ind} are past the end of the payload')
+
+            step = np.frombuffer(data, dtype='<f8', count=n, offset=offset)
+            offset += n * 8
+            value = np.frombuffer(data, dtype='<f8', count=n, offset=offset)
+            offset += n * 8
+
+            track[ind] = {'step': step, 'value': value}
+
+    return packets
@@ -0,0 +1,253 @@
+"""
+Replays synthetic runs and sessions against the app in this process and reports latencies and ingest throughput.
+Every other run and session sends binary packets, and the rest send JSON.
+If any request fails, it stops with the failures of each endpoint instead of reporting latencies.
+
+Run it as a script, so that `concurrency` can be imported from this folder, with the server on `PYTHONPATH`:
+
+    cd app/server
+    PYTHONPATH=. python unit_tests/benchmark.py --runs 8 --sessions 2 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+
+import labml
+from labml import monit
+
+from concurrency import init_file_db
+from labml_app import handlers, ingest, settings
+from labml_app.db import project, user
+from labml_app.utils import packets
+
+USER = {'name': 'benchmark', 'email': 'benchmark@labml.ai', 'sub': 'benchmark', 'email_verified': True,
+        'picture': ''}
+
+
+class Latencies:
+    """
+    Latencies and failed requests of each endpoint, with the response of the first failure
+    """
+
+    def __init__(self):
+        self.times: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.first_errors: Dict[str, str] = {}
+
+    async def request(self, name: str, client: httpx.AsyncClient, method: str, url: str, **kwargs) -> Any:
+        if name not in self.times:
+            self.times[name] = []
+            self.errors[name] = 0
+
+        start = time.perf_counter()
+        res = await client.request(method, url, **kwargs)
+        self.times[name].append(time.perf_counter() - start)
+
+        if res.status_code != 200:
+            self.errors[name] += 1
+            if name not in self.first_errors:
+                self.first_errors[name] = f'{res.status_code} {res.text[:200]}'
+            return None
+
+        return res.json()
+
+    def error_report(self) -> str:
+        return '\n'.join(f'{name}: {self.errors[name]} of {len(self.times[name])} requests failed, '
+                         f'first with {self.first_errors[name]}'
+                         for name in self.times if self.errors[name])
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        res = {}
+        for name, times in self.times.items():
+            ms = np.array(times) * 1000
+            res[name] = {'count': len(ms),
+                         'errors': self.errors[name],
+                         'mean_ms': ms.mean().item(),
+                         'p50_ms': np.percentile(ms, 50).item(),
+                         'p99_ms': np.percentile(ms, 99).item(),
+                         'max_ms': ms.max().item()}
+
+        return res
+
+
+def _exception_response(request: Request, e: Exception) -> PlainTextResponse:
+    """
+    Puts the exception in the error report, instead of Internal Server Error
+    """
+    return PlainTextResponse(f'{type(e).__name__}: {e}', status_code=500)
+
+
+def get_run_packet(run_uuid: str, push: int, n_indicators: int, n_points: int) -> Dict[str, Any]:
+    steps = np.arange(push * n_points, (push + 1) * n_points, dtype=float).tolist()
+    track = {f'loss.{i}': {'step': steps, 'value': np.random.random(n_points).tolist()}
+             for i in range(n_indicators)}
+
+    data = {'track': track, 'time': time.time()}
+    if push == 0:
+        data.update({'name': 'benchmark', 'comment': run_uuid, 'computer': uuid.uuid4().hex})
+
+    return data
+
+
+def get_session_packet(session_uuid: str, push: int, n_cpus: int, n_processes: int,
+                       n_points: int) -> Dict[str, Any]:
+    """
+    Telemetry like the monitor of a computer sends: cpu cores, memory and processes
+    """
+    steps = np.arange(push * n_points, (push + 1) * n_points, dtype=float).tolist()
+
+    def _series():
+        return {'step': steps, 'value': np.random.random(n_points).tolist()}
+
+    track = {f'cpu.perc.{c}': _series() for c in range(n_cpus)}
+    track['memory.used'] = _series()
+    for p in range(n_processes):
+        track[f'process.{p}.cpu'] = _series()
+        track[f'process.{p}.rss'] = {'step': steps, 'value': (np.random.random(n_points) * 1e9).tolist()}
+        # the monitor sends names with every push, and they are coalesced with the numeric series
+        track[f'process.{p}.name'] = {'step': steps[:1], 'value': [f'worker_{p}']}
+        track[f'process.{p}.pid'] = {'step': steps[:1], 'value': [float(p)]}
+
+    data = {'track': track, 'time': time.time()}
+    if push == 0:
+        data.update({'name': 'benchmark', 'comment': session_uuid})
+
+    return data
+
+
+def get_body(data: List[Dict[str, Any]], is_binary: bool) -> Dict[str, Any]:
+    """
+    Request arguments that send packets as JSON, or in the binary format of `packets`
+    """
+    if is_binary:
+        return {'content': packets.encode(data), 'headers': {'Content-Type': packets.CONTENT_TYPE}}
+    else:
+        return {'json': data}
+
+
+async def replay_run(client: httpx.AsyncClient, latencies: Latencies, labml_token: str, run_uuid: str,
+                     is_binary: bool, args: argparse.Namespace):
+    params = {'run_uuid': run_uuid, 'labml_token': labml_token, 'labml_version': labml.__version__}
+    name = 'update_run_binary' if is_binary else 'update_run'
+    for push in range(args.pushes):
+        data = [get_run_packet(run_uuid, push, args.indicators, args.points)]
+        await latencies.request(name, client, 'POST', '/api/v1/track', params=params, **get_body(data, is_binary))
+        if args.interval:
+            await asyncio.sleep(args.interval)
+
+
+async def replay_session(client: httpx.AsyncClient, latencies: Latencies, labml_token: str, session_uuid: str,
+                         is_binary: bool, args: argparse.Namespace):
+    params = {'session_uuid': session_uuid, 'computer_uuid': uuid.uuid4().hex, 'labml_token': labml_token,
+              'labml_version': labml.__version__}
+    name = 'update_session_binary' if is_binary else 'update_session'
+    for push in range(args.pushes):
+        data = [get_session_packet(session_uuid, push, args.cpus, args.processes, args.points)]
+        await latencies.request(name, client, 'POST', '/api/v1/computer', params=params,
+                                **get_body(data, is_binary))
+        if args.interval:
+            await asyncio.sleep(args.interval)
+
+
+async def query(client: httpx.AsyncClient, latencies: Latencies, app_token: str, labml_token: str,
+                run_uuids: List[str], n_queries: int):
+    headers = {'Authorization': app_token}
+    for _ in range(n_queries):
+        for run_uuid in run_uuids:
+            await latencies.request('metrics', client, 'GET', f'/api/v1/metrics/{run_uuid}', headers=headers)
+        await latencies.request('runs', client, 'GET', f'/api/v1/runs/{labml_token}', headers=headers)
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    app = FastAPI()
+    handlers.add_handlers(app)
+    app.add_exception_handler(Exception, _exception_response)
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        latencies = Latencies()
+
+        res = await latencies.request('sign_in', client, 'POST', '/api/v1/auth/sign_in', json=USER)
+        if res is None:
+            raise SystemExit(f'sign in failed\n{latencies.error_report()}')
+        app_token = res['app_token']
+        labml_token = user.get_or_create_user(user.AuthOInfo(**USER)).default_project.labml_token
+
+        run_uuids = [uuid.uuid4().hex for _ in range(args.runs)]
+        session_uuids = [uuid.uuid4().hex for _ in range(args.sessions)]
+
+        start = time.perf_counter()
+        with monit.section(f'replay {args.runs} runs and {args.sessions} sessions'):
+            await asyncio.gather(*[replay_run(client, latencies, labml_token, r, i % 2 == 1, args)
+                                   for i, r in enumerate(run_uuids)],
+                                 *[replay_session(client, latencies, labml_token, s, i % 2 == 1, args)
+                                   for i, s in enumerate(session_uuids)])
+        pushed = time.perf_counter()
+
+        with monit.section('drain ingest queues'):
+            await ingest.run_queue.join()
+            await ingest.session_queue.join()
+        ingested = time.perf_counter()
+
+        with monit.section('query'):
+            await query(client, latencies, app_token, labml_token, run_uuids, args.queries)
+
+    # latencies of failed requests aren't comparable, so they are not reported
+    if latencies.first_errors:
+        raise SystemExit(f'requests failed\n{latencies.error_report()}')
+
+    n_run_points = args.runs * args.pushes * args.indicators * args.points
+    n_session_points = args.sessions * args.pushes * (args.cpus + 1 + 2 * args.processes) * args.points
+
+    return {
+        'config': vars(args),
+        'latency': latencies.summary(),
+        'ingest': {'points': n_run_points + n_session_points,
+                   'push_seconds': pushed - start,
+                   'drain_seconds': ingested - pushed,
+                   'seconds': ingested - start,
+                   'points_per_second': (n_run_points + n_session_points) / (ingested - start)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replays synthetic runs and sessions against the app in this '
+                                                 'process, with the file database in a temporary folder')
+    parser.add_argument('--runs', type=int, default=8)
+    parser.add_argument('--sessions', type=int, default=2)
+    parser.add_argument('--pushes', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0., help='seconds between pushes of a run or session')
+    parser.add_argument('--indicators', type=int, default=20)
+    parser.add_argument('--points', type=int, default=10, help='points of each indicator in a push')
+    parser.add_argument('--cpus', type=int, default=8)
+    parser.add_argument('--processes', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=10, help='times to query metrics of each run and runs list')
+    parser.add_argument('--output', default='', help='JSON file for the results, printed if empty')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_path:
+        init_file_db(Path(data_path))
+        project.create_project(settings.FLOAT_PROJECT_TOKEN, 'float project')
+
+        results = asyncio.run(benchmark(args))
+
+    results['time'] = time.time()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import multiprocessing
+import tempfile
+from pathlib import Path
+
+from labml import monit
+from labml_db import Model, Index
+from labml_db.index_driver.file import FileIndexDbDriver
+from labml_db.serializer.pickle import PickleSerializer
+from labml_db.serializer.yaml import YamlSerializer
+
+from labml_app import db
+from labml_app.analyses import AnalysisManager
+from labml_app.db import locks
+from labml_app.db.file_driver import AtomicFileDbDriver
+
+RUN_UUID = 'concurrency_test_run'
+
+
+def init_file_db(data_path: Path):
+    Model.set_db_drivers([AtomicFileDbDriver(PickleSerializer(), m, data_path / m.__name__) for s, m in db.Models])
+    Index.set_db_drivers([FileIndexDbDriver(YamlSerializer(), m, data_path / f'{m.__name__}.yaml')
+                          for m in db.Indexes])
+    locks.set_path(data_path / 'locks')
+
+
+def track(worker: int, n_packets: int, is_locked: bool):
+    """
+    Each packet tracks a new indicator, so a lost update loses indicators.
+    The total should be within `settings.INDICATOR_LIMIT`.
+    """
+    for i in range(n_packets):
+        data = {f'loss.w{worker}_{i}': {'step': [float(i)], 'value': [float(worker)]}}
+        if is_locked:
+            with locks.lock(RUN_UUID):
+                AnalysisManager.track(RUN_UUID, data)
+        else:
+            try:
+                AnalysisManager.track(RUN_UUID, data)
+            except EOFError:  # read a file while another process was writing it
+                pass
+
+
+def check_concurrent_updates(n_workers: int = 4, n_packets: int = 20, is_locked: bool = True) -> int:
+    with tempfile.TemporaryDirectory() as data_path:
+        init_file_db(Path(data_path))
+        # create the analysis before forking, since file indexes are cached in each process
+        AnalysisManager.get_experiment_analysis('MetricsAnalysis', RUN_UUID)
+
+        ctx = multiprocessing.get_context('fork')
+        workers = [ctx.Process(target=track, args=(w, n_packets, is_locked)) for w in range(n_workers)]
+        with monit.section(f'{n_workers} workers, {"locked" if is_locked else "not locked"}'):
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+
+        metrics = AnalysisManager.get_experiment_analysis('MetricsAnalysis', RUN_UUID).metrics
+        n_tracked = len(metrics.get_series_names())
+
+    print(f'tracked {n_tracked} of {n_workers * n_packets} indicators')
+
+    return n_tracked
+
+
+if __name__ == "__main__":
+    assert check_concurrent_updates(is_locked=True) == 4 * 20
+    check_concurrent_updates(is_locked=False)
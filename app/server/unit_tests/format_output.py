@@ -0,0 +1,82 @@
+import random
+
+from labml import monit
+
+from labml_app.db import run
+
+Run = run.Run
+
+
+def format_output_old(output: str) -> (str, str):
+    res = []
+    temp = ''
+    for i, c in enumerate(output):
+        if c == '\n':
+            temp += '\n'
+            res.append(temp)
+            temp = ''
+        elif c == '\r' and len(output) > i + 1 and output[i + 1] == '\n':
+            pass
+        elif c == '\r':
+            temp = ''
+        else:
+            temp += c
+
+    return ''.join(res), temp
+
+
+def create_random_output(length: int) -> str:
+    return ''.join(random.choice('ab \r\n') for _ in range(length))
+
+
+def create_tqdm_log(size: int) -> str:
+    """
+    Training log where each epoch has a progress bar redrawn with `\r`
+    """
+    res = []
+    total = 0
+    epoch = 0
+    while total < size:
+        line = f'Epoch {epoch}\n'
+        res.append(line)
+        total += len(line)
+        for i in range(100):
+            line = f'\r{i:3d}%|{"#" * (i // 10):<10}| {i}/100 [00:{i:02d}<00:00, 12.34it/s, loss={random.random():.4f}]'
+            res.append(line)
+            total += len(line)
+        res.append('\r\n')
+        total += 2
+        epoch += 1
+
+    return ''.join(res)
+
+
+def check_parity():
+    for s in ['', '\r', '\n', '\r\n', '\n\r', 'a\r', 'a\r\n', 'a\r\r\nb', 'ab\rc\n\rd', '\r\r\n\r']:
+        assert Run.format_output(s) == format_output_old(s), repr(s)
+
+    for _ in range(2000):
+        s = create_random_output(random.randint(0, 50))
+        assert Run.format_output(s) == format_output_old(s), repr(s)
+
+    s = create_tqdm_log(100_000)
+    assert Run.format_output(s) == format_output_old(s)
+
+    print('format_output parity: ok')
+
+
+def benchmark(size: int = 50 * 1024 * 1024):
+    log = create_tqdm_log(size)
+
+    with monit.section(f'Old format_output {len(log) / 1024 / 1024 :.1f}MB'):
+        old = format_output_old(log)
+
+    with monit.section(f'New format_output {len(log) / 1024 / 1024 :.1f}MB'):
+        new = Run.format_output(log)
+
+    assert new == old
+
+
+if __name__ == "__main__":
+    check_parity()
+    benchmark()
@@ -0,0 +1,26 @@
+import numpy as np
+
+import labml_app.db  # the database models need to be imported before the analyses
+from labml_app import ingest
+
+
+def check_coalesce_session_packets():
+    """
+    The first packet of a session has process names, which are strings
+    """
+    first = {'process.0.name': {'step': [0.], 'value': ['python']},
+             'process.0.cpu': {'step': [0., 1.], 'value': [0.5, 0.6]}}
+    second = {'process.0.cpu': {'step': np.array([2.]), 'value': np.array([0.7])},
+              'process.1.name': {'step': [2.], 'value': ['worker']}}
+
+    track = ingest.coalesce([first, second])
+
+    assert track['process.0.name']['value'].tolist() == ['python']
+    assert track['process.1.name']['value'].tolist() == ['worker']
+    assert track['process.0.cpu']['step'].tolist() == [0., 1., 2.]
+    assert track['process.0.cpu']['value'].dtype == float
+    assert track['process.0.cpu']['value'].tolist() == [0.5, 0.6, 0.7]
+
+
+if __name__ == "__main__":
+    check_coalesce_session_packets()
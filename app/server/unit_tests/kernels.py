@@ -0,0 +1,116 @@
+import numpy as np
+from labml import monit
+from numpy.random import random, randn, randint
+
+from labml_app.db import analyses
+
+Series = analyses.series.Series
+labml_fast_merge = analyses.series.labml_fast_merge
+
+
+def create_series(n_points: int) -> Series:
+    s = Series()
+    s.step = np.cumsum(randint(1, 5, n_points)).astype(float)
+    s.last_step = s.step.copy()
+    s.value = np.cumsum(randn(n_points)) + random(n_points)
+
+    return s
+
+
+def use_python(s: Series) -> Series:
+    s._merge = s._merge_old
+    s._remove_nan = s._remove_nan_old
+    s._smooth_value = s._smooth_value_np
+    s._mean_angle = s._mean_angle_np
+    s._get_extent = s._get_extent_np
+
+    return s
+
+
+def check_remove_nan(n_points: int):
+    values = random(n_points)
+    values[random(n_points) < 0.2] = np.nan
+    values[random(n_points) < 0.05] = np.inf
+    values[0] = np.nan
+
+    s = create_series(n_points)
+    fast, old = values.copy(), values.copy()
+    s._remove_nan_fast(fast)
+    s._remove_nan_old(old)
+
+    assert np.array_equal(fast, old)
+
+
+def check_merge(n_points: int):
+    s = create_series(n_points)
+    s.step_gap = randint(1, 10)
+    fast = [s.value.copy(), s.last_step.copy(), s.step.copy()]
+    old = [s.value.copy(), s.last_step.copy(), s.step.copy()]
+
+    n_fast = s._merge_fast(*fast)
+    n_old = s._merge_old(*old)
+
+    assert n_fast == n_old
+    for f, o in zip(fast, old):
+        assert np.array_equal(f[:n_fast], o[:n_old])
+
+
+def check_series(n_points: int):
+    s = create_series(n_points)
+    scale = max(np.abs(s.value).max(), 1.)
+
+    for span in [1, 2, 3, 10, 51, n_points, n_points * 2]:
+        fast = s._smooth_value_fast(span)
+        assert np.array_equal(fast, s._smooth_value_old(span))
+        assert np.array_equal(fast, s._smooth_value_np(span))
+
+        x_range = s.last_step.max() - s.last_step.min()
+        assert np.isclose(s._mean_angle_fast(fast, x_range, scale, 0.5),
+                          s._mean_angle_np(fast, x_range, scale, 0.5), rtol=1e-12)
+
+    if n_points >= 10:
+        assert s._get_extent_fast() == s._get_extent_old() == s._get_extent_np()
+
+    assert np.array_equal(s.smooth_45(), use_python(s).smooth_45())
+
+
+def check_parity():
+    for n in [*range(2, 20), 100, 1024, 2048]:
+        for _ in range(5):
+            check_remove_nan(n)
+            check_merge(n)
+            check_series(n)
+
+    print('kernel parity: ok')
+
+
+def benchmark(n_points: int = 1024, n_series: int = 200):
+    series = [create_series(n_points) for _ in range(n_series)]
+
+    for name in ['fast', 'python']:
+        with monit.section(f'{name} smooth_45 {n_points}x{n_series}'):
+            for s in series:
+                s.smooth_45()
+
+        with monit.section(f'{name} get_extent {n_points}x{n_series}'):
+            for s in series:
+                s._get_extent()
+
+        with monit.section(f'{name} update {n_points}x{n_series}'):
+            for s in series:
+                u = Series()
+                if name == 'python':
+                    use_python(u)
+                for i in range(0, n_points, 16):
+                    u.update(s.step[i:i + 16], s.value[i:i + 16])
+
+        series = [use_python(s) for s in series]
+
+
+if __name__ == "__main__":
+    if labml_fast_merge is None:
+        print('labml_fast_merge is not installed. '
+              'Build it with `python setup.py build_ext --inplace` in app/cpp/labml_fast_merge')
+    else:
+        check_parity()
+        benchmark()
@@ -0,0 +1,99 @@
+import argparse
+import threading
+import time
+import uuid
+from typing import List, Dict
+
+import numpy as np
+import requests
+
+import labml
+from labml import logger
+from labml.logger import Text
+
+
+class TrainingClient(threading.Thread):
+    """
+    Pushes tracking data like a training run would, waiting for the interval the server advertises
+    """
+
+    def __init__(self, url: str, n_pushes: int, n_indicators: int, points_per_push: int):
+        super().__init__(daemon=True)
+        self.url = url
+        self.n_pushes = n_pushes
+        self.n_indicators = n_indicators
+        self.points_per_push = points_per_push
+        self.run_uuid = uuid.uuid4().hex
+        self.latencies: List[float] = []
+        self.waited = 0.
+        self.errors = 0
+
+    def _get_packet(self, push: int) -> Dict[str, any]:
+        start = push * self.points_per_push
+        steps = [*range(start, start + self.points_per_push)]
+        track = {}
+        for i in range(self.n_indicators):
+            track[f'loss.{i}'] = {'step': steps, 'value': np.random.random(len(steps)).tolist()}
+
+        data = {'track': track, 'time': time.time()}
+        if push == 0:
+            data.update({'name': 'load test', 'comment': self.run_uuid, 'computer': uuid.uuid4().hex})
+
+        return data
+
+    def run(self):
+        params = {'run_uuid': self.run_uuid, 'labml_token': '', 'labml_version': labml.__version__}
+        for push in range(self.n_pushes):
+            start = time.time()
+            try:
+                res = requests.post(self.url, params=params, json=[self._get_packet(push)])
+                res.raise_for_status()
+                push_interval = res.json().get('push_interval', 0)
+            except requests.RequestException:
+                self.errors += 1
+                push_interval = 1
+            self.latencies.append(time.time() - start)
+
+            if push < self.n_pushes - 1:
+                self.waited += push_interval
+                time.sleep(push_interval)
+
+
+def load_test(url: str, n_clients: int, n_pushes: int, n_indicators: int, points_per_push: int):
+    clients = [TrainingClient(url, n_pushes, n_indicators, points_per_push) for _ in range(n_clients)]
+
+    start = time.time()
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    total = time.time() - start
+
+    latencies = np.array([t for c in clients for t in c.latencies]) * 1000
+    errors = sum(c.errors for c in clients)
+    waited = sum(c.waited for c in clients) / n_clients
+
+    logger.inspect(clients=n_clients,
+                   pushes=len(latencies),
+                   errors=errors,
+                   total_seconds=total,
+                   pushes_per_second=len(latencies) / total,
+                   mean_push_interval=waited / max(n_pushes - 1, 1),
+                   p50_ms=np.percentile(latencies, 50),
+                   p99_ms=np.percentile(latencies, 99),
+                   max_ms=latencies.max())
+
+    if errors:
+        logger.log(f'{errors} pushes failed', Text.danger)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Simulates concurrent training clients against a local server')
+    parser.add_argument('--url', default='http://localhost:5000/api/v1/track')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--pushes', type=int, default=10)
+    parser.add_argument('--indicators', type=int, default=10)
+    parser.add_argument('--points', type=int, default=20)
+    args = parser.parse_args()
+
+    load_test(args.url, args.clients, args.pushes, args.indicators, args.points)
@@ -0,0 +1,68 @@
+import gzip
+import json
+
+import numpy as np
+
+import labml_app.db  # the database models need to be imported before the analyses
+from labml_app.utils import packets
+
+
+def _encode_raw(header, buffers: bytes = b'') -> bytes:
+    header = json.dumps(header).encode('utf-8')
+
+    return gzip.compress(packets.HEADER_SIZE.pack(len(header)) + header + buffers)
+
+
+def _is_rejected(body: bytes) -> bool:
+    try:
+        packets.decode(body)
+    except packets.PacketError:
+        return True
+
+    return False
+
+
+def check_round_trip():
+    data = [{'track': {'loss': {'step': [0., 1.], 'value': [0.5, 0.25]},
+                       'empty': {'step': [], 'value': []},
+                       'process.0.name': {'step': [0.], 'value': ['python']}},
+             'time': 1.}]
+
+    track = packets.decode(packets.encode(data))[0]['track']
+
+    assert track['loss']['step'].tolist() == [0., 1.]
+    assert track['loss']['value'].tolist() == [0.5, 0.25]
+    assert track['empty']['value'].tolist() == []
+    assert track['process.0.name'] == {'step': [0.], 'value': ['python']}
+
+
+def check_malformed():
+    buffers = np.arange(4, dtype='<f8').tobytes()
+
+    assert _is_rejected(b'not gzip')
+    assert _is_rejected(packets.encode([{'time': 1.}])[:-4])
+    assert _is_rejected(gzip.compress(b'\x01'))
+    assert _is_rejected(gzip.compress(packets.HEADER_SIZE.pack(100) + b'[]'))
+    assert _is_rejected(_encode_raw({'track': {}}))
+    assert _is_rejected(_encode_raw([{'track': []}]))
+    assert _is_rejected(_encode_raw([{'track': {'loss': {'n': -1}}}], buffers))
+    assert _is_rejected(_encode_raw([{'track': {'loss': {'n': 1.5}}}], buffers))
+    assert _is_rejected(_encode_raw([{'track': {'loss': {'n': 3}}}], buffers))
+    assert not _is_rejected(_encode_raw([{'track': {'loss': {'n': 2}}}], buffers))
+
+
+def check_size_limit():
+    max_size = packets.MAX_DECODED_SIZE
+    packets.MAX_DECODED_SIZE = 1024 * 1024
+
+    # compresses to about 1KB
+    body = gzip.compress(bytes(4 * packets.MAX_DECODED_SIZE))
+    assert _is_rejected(body)
+
+    packets.MAX_DECODED_SIZE = max_size
+
+
+if __name__ == "__main__":
+    check_round_trip()
+    check_malformed()
+    check_size_limit()
@@ -0,0 +1,80 @@
+"""
+Run from `app/server`:
+    python -m unit_tests.process
+"""
+import tempfile
+from pathlib import Path
+from typing import Dict, Any
+
+import numpy as np
+
+from unit_tests.concurrency import init_file_db
+from labml_app.analyses.computers import process
+from labml_app.analyses.computers.process import ProcessAnalysis, ProcessIndex
+
+
+def get_packet(step: int, processes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    track = {}
+    for process_id, p in processes.items():
+        for k, v in p.items():
+            dtype = float if k in ['cpu', 'rss'] else object
+            track[f'process.{process_id}.{k}'] = {'step': np.array([float(step)]), 'value': np.array([v], dtype=dtype)}
+
+    return track
+
+
+def check_compact():
+    """
+    Dead processes with negligible CPU and RSS are rolled up by name, and live or busy ones are kept
+    """
+    ans = ProcessAnalysis.get_or_create('compact')
+    ans.track(get_packet(0, {'0': {'name': 'python', 'cpu': 0.5, 'rss': 1e9},
+                             '1': {'name': 'worker', 'dead': 1, 'cpu': 0., 'rss': 1e6},
+                             '2': {'name': 'worker', 'dead': 1, 'cpu': 0.002, 'rss': 2e6},
+                             '3': {'name': 'loader', 'dead': 1, 'cpu': 0.5, 'rss': 1e9}}))
+    for step in range(1, process.COMPACTION_INTERVAL):
+        ans.track(get_packet(step, {'0': {'cpu': 0.5, 'rss': 1e9}}))
+
+    ans = ProcessAnalysis(ProcessIndex.get('compact').load())
+
+    aggregates = ans.get_aggregates()
+    assert len(aggregates) == 1
+    assert aggregates[0]['name'] == 'worker'
+    assert aggregates[0]['count'] == 2
+    assert np.isclose(aggregates[0]['mean_cpu'], 0.001)
+    assert aggregates[0]['max_rss'] == 2e6
+
+    assert sorted(ans.process.names.keys()) == ['process.0', 'process.3']
+    assert sorted(ans.process.get_series_names()) == ['process.0.cpu', 'process.0.rss',
+                                                      'process.3.cpu', 'process.3.rss']
+    assert [p['process_id'] for p in ans.get_tracking()[0]] == ['process.0']
+
+
+def check_compaction_retry():
+    """
+    Over `MAX_PROCESSES` with no dead process, compaction isn't retried until the next interval
+    """
+    max_processes = process.MAX_PROCESSES
+    process.MAX_PROCESSES = 2
+
+    ans = ProcessAnalysis.get_or_create('retry')
+    compacted = []
+    compact = ans.compact
+    ans.compact = lambda: compacted.append(ans.process.tracks_since_compaction) or compact()
+
+    processes = {str(i): {'name': 'python', 'cpu': 0.5, 'rss': 1e9} for i in range(3)}
+    for step in range(process.COMPACTION_INTERVAL + 1):
+        ans.track(get_packet(step, processes))
+
+    process.MAX_PROCESSES = max_processes
+
+    assert compacted == [1, process.COMPACTION_INTERVAL], compacted
+    assert len(ans.process.names) == 3
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as data_path:
+        init_file_db(Path(data_path))
+
+        check_compact()
+        check_compaction_retry()
@@ -15,7 +15,7 @@ def update_equal_gap_equal_sizes(prev: int = 0, size=10, gap: int = 5, max_step=
 
         prev = step[-1] + gap
 
-        s = analyses.series.Series().load(data)
+        s = analyses.series.Series().load(data, copy=False)
         s.update(step, value)
 
         data = s.to_data()
@@ -159,7 +159,27 @@ def update_equal_and_diff_gaps_diff_sizes(prev: int = 0, size=5, gap: int = 1, m
     print(data['step'].tolist())
 
 
+def check_load_copies():
+    """
+    Updating a loaded series shouldn't change the data it was loaded from
+    """
+    s = analyses.series.Series()
+    s.update([*range(10)], random(10).tolist())
+    s.update([*range(10, 12)], random(2).tolist())  # leaves spare capacity in the buffers
+    data = s.to_data()
+    step, value = data['step'].copy(), data['value'].copy()
+
+    loaded = analyses.series.Series().load(data)
+    loaded.update([*range(12, 20)], random(8).tolist())
+    loaded.step_gap = 4
+    loaded.merge()
+
+    assert (data['step'] == step).all() and (data['value'] == value).all()
+
+
 if __name__ == "__main__":
+    check_load_copies()
+
     with monit.section("Equal gap"):
         update_equal_gap_equal_sizes(size=10000, max_step=1_000_000, gap=1)
 
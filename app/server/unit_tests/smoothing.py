@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+from labml import monit
+from numpy.random import random, randn, randint
+
+from labml_app.db import analyses
+
+Series = analyses.series.Series
+
+
+def smooth_45_old(s: Series):
+    forty_five = math.pi / 4
+    hi = max(1, len(s.value) // analyses.series.MIN_SMOOTH_POINTS)
+    lo = 1
+
+    while lo < hi:
+        m = (lo + hi) // 2
+        smoothed = s._smooth_value_old(m)
+        angle = s._mean_angle_old(smoothed, 0.5)
+        if angle > forty_five:
+            lo = m + 1
+        else:
+            hi = m
+
+    return s._smooth_value_old(hi)
+
+
+def create_series(n_points: int) -> Series:
+    s = Series()
+    s.step = np.arange(n_points, dtype=float)
+    s.last_step = np.arange(n_points, dtype=float)
+    s.value = np.cumsum(randn(n_points)) + random(n_points)
+
+    return s
+
+
+def is_equal(a, b):
+    return np.array_equal(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+
+
+def check_parity(n_points: int = 1024, n_series: int = 20):
+    for _ in range(n_series):
+        s = create_series(n_points)
+        for span in [1, 2, 3, 10, 51, n_points, n_points * 2]:
+            assert is_equal(s.smooth_value(span), s._smooth_value_old(span))
+            smoothed = s.smooth_value(span)
+            assert np.isclose(s.mean_angle(smoothed, 0.5), s._mean_angle_old(smoothed, 0.5), rtol=1e-12)
+
+        assert is_equal(s.smooth_45(), smooth_45_old(s))
+
+    for n in range(0, 12):
+        s = create_series(n)
+        assert is_equal(s.smooth_45(), smooth_45_old(s))
+
+    print('smoothing parity: ok')
+
+
+def check_extent_parity(n_series: int = 20):
+    for n in [*range(10, 60), 1024, 2048]:
+        for _ in range(n_series):
+            s = create_series(n)
+            s.value[randint(0, n, 3)] *= 100
+            assert s._get_extent_np() == s._get_extent_old()
+
+    print('extent parity: ok')
+
+
+def benchmark(n_points: int = 1024, n_series: int = 200, n_repeats: int = 10):
+    series = [create_series(n_points) for _ in range(n_series)]
+
+    with monit.section(f'Python smooth_45 {n_points}x{n_series}'):
+        for s in series:
+            smooth_45_old(s)
+
+    with monit.section(f'NumPy smooth_45 {n_points}x{n_series}'):
+        for s in series:
+            s.extent = None
+            s.smooth_45()
+
+    # a few outliers, so that the margin scans don't stop at the first value
+    for s in series:
+        s.value[randint(0, n_points, 3)] *= 100
+
+    # each takes a few milliseconds, so repeat to smooth out noise
+    with monit.section(f'Python get_extent {n_points}x{n_series}x{n_repeats}'):
+        for _ in range(n_repeats):
+            for s in series:
+                s._get_extent_old()
+
+    with monit.section(f'NumPy get_extent {n_points}x{n_series}x{n_repeats}'):
+        for _ in range(n_repeats):
+            for s in series:
+                s._get_extent_np()
+
+
+if __name__ == "__main__":
+    check_parity()
+    check_extent_parity()
+    benchmark()
@@ -1 +1 @@
-__version__ = '0.4.126'
+__version__ = '0.4.127'
@@ -12,6 +12,7 @@ import labml
 from labml import logger
 from labml.logger import Text
 from labml.utils.notice import labml_notice
+from . import packets
 
 UPDATING_APP_MESSAGE = 'Updating App. Please wait'
 
@@ -50,12 +51,16 @@ class _WebApiThread(threading.Thread):
         self.is_stopped = False
         self.errored = False
         self.handlers: List[ApiResponseHandler] = []
+        self.next_push_time = 0.
+        self.is_binary_accepted = False
+        self.wake = threading.Event()
 
     def push_data_source(self, data_source: ApiDataSource):
         self.queue.put(data_source)
 
     def stop(self):
         self.is_stopped = True
+        self.wake.set()
         logger.log('Still updating app.labml.ai, please wait for it to complete...', Text.highlight)
         self.please_wait_count = 1
 
@@ -92,8 +97,21 @@ class _WebApiThread(threading.Thread):
         packets = [s.get_data_packet() for s in sources]
         return [p for p in packets if not self._is_updating_notification(p)]
 
+    def _wait_for_push(self):
+        """
+        Waits for the push interval advertised by the server.
+        Packets that arrive meanwhile are sent together.
+        """
+        if self.is_stopped:
+            return
+
+        wait = self.next_push_time - time.time()
+        if wait > 0:
+            self.wake.wait(wait)
+
     def run(self):
         while True:
+            self._wait_for_push()
             packets = self._get_packets()
             if self.is_stopped:
                 if not packets:
@@ -145,6 +163,8 @@ class _WebApiThread(threading.Thread):
                           str(e)])
             return False
 
+        self.next_push_time = time.time() + response.get('push_interval', 0)
+
         for h in self.handlers:
             if h.handle(response):
                 break
@@ -153,15 +173,24 @@ class _WebApiThread(threading.Thread):
 
     def _send(self, data: List[Dict[str, any]]) -> Dict:
         req = urllib.request.Request(self.url)
-        req.add_header('Content-Type', 'application/json; charset=utf-8')
-        data_json = json.dumps(data)
-        data_json = data_json.encode('utf-8')
-        req.add_header('Content-Length', str(len(data)))
-
-        response = urllib.request.urlopen(req, data_json, timeout=self.timeout_seconds)
+        body = None
+        if self.is_binary_accepted:
+            try:
+                body = packets.encode(data)
+                req.add_header('Content-Type', packets.CONTENT_TYPE)
+            except (TypeError, ValueError) as e:
+                logger.log(f'Failed to encode packets, sending them as JSON: {e}', Text.warning)
+        if body is None:
+            req.add_header('Content-Type', 'application/json; charset=utf-8')
+            body = packets.to_json(data)
+        req.add_header('Content-Length', str(len(body)))
+
+        response = urllib.request.urlopen(req, body, timeout=self.timeout_seconds)
         content = response.read().decode('utf-8')
         result = json.loads(content)
 
+        self.is_binary_accepted = packets.CONTENT_TYPE in result.get('accept', [])
+
         for e in result.get('errors', []):
             if 'error' in e:
                 labml_notice(['LabML App Error: ', (e['error'] + '', Text.key), '\n',
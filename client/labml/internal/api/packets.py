@@ -0,0 +1,56 @@
+import gzip
+import json
+import struct
+from typing import List, Dict
+
+import numpy as np
+
+CONTENT_TYPE = 'application/x-labml-packets'
+
+HEADER_SIZE = struct.Struct('<I')
+
+
+def to_json(data: List[Dict[str, any]]) -> bytes:
+    return json.dumps(data, default=_to_list).encode('utf-8')
+
+
+def _to_list(o):
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+
+    raise TypeError(f'Object of type {o.__class__.__name__} is not JSON serializable')
+
+
+def encode(data: List[Dict[str, any]]) -> bytes:
+    """
+    Encodes packets with tracked series as float64 buffers, compressed with gzip.
+
+    The payload is the length of a JSON header as a little endian `uint32`, the header,
+     and then the buffers.
+    The header is the list of packets, with each numeric `track` series given as `{'n': length}`.
+    Series that are not numeric, like process names, are kept as they are in the header.
+    Buffers are in the order of packets and series in the header, `step` followed by `value`.
+    """
+    header = []
+    buffers = []
+    for p in data:
+        if 'track' not in p:
+            header.append(p)
+            continue
+
+        track = {}
+        for ind, series in p['track'].items():
+            try:
+                step = np.asarray(series['step'], dtype='<f8')
+                value = np.asarray(series['value'], dtype='<f8')
+            except (TypeError, ValueError):
+                track[ind] = series
+                continue
+            track[ind] = {'n': len(step)}
+            buffers += [step.tobytes(), value.tobytes()]
+
+        header.append({**p, 'track': track})
+
+    header = to_json(header)
+
+    return gzip.compress(b''.join([HEADER_SIZE.pack(len(header)), header, *buffers]), compresslevel=6)
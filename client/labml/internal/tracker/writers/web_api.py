@@ -101,8 +101,8 @@ class Writer(WriteBase, ApiDataSource):
                 value = np.mean(value.reshape(n, 2), axis=-1)
 
             data[key] = {
-                'step': step.tolist(),
-                'value': value.tolist()
+                'step': step.astype(np.float64),
+                'value': value.astype(np.float64)
             }
 
         return data
@@ -0,0 +1,36 @@
+import gzip
+import json
+
+import numpy as np
+
+from labml.internal.api import packets
+
+
+def _decode_header(body: bytes):
+    data = gzip.decompress(body)
+    header_size, = packets.HEADER_SIZE.unpack_from(data, 0)
+    offset = packets.HEADER_SIZE.size
+
+    return json.loads(data[offset:offset + header_size].decode('utf-8')), len(data) - offset - header_size
+
+
+def test_string_series():
+    """
+    Process names and command lines of the computer monitor are strings, and stay in the header
+    """
+    data = [{'track': {'process.0.name': {'step': [0], 'value': ['python']},
+                       'process.0.cmdline': {'step': [0], 'value': ['python\ntrain.py']},
+                       'process.0.rss': {'step': np.arange(3), 'value': np.array([1., 2., 3.])}},
+             'time': 1.}]
+
+    header, buffers_size = _decode_header(packets.encode(data))
+    track = header[0]['track']
+
+    assert track['process.0.name'] == {'step': [0], 'value': ['python']}
+    assert track['process.0.cmdline'] == {'step': [0], 'value': ['python\ntrain.py']}
+    assert track['process.0.rss'] == {'n': 3}
+    assert buffers_size == 2 * 3 * 8
+
+
+if __name__ == '__main__':
+    test_string_series()